@@ -0,0 +1 @@
+"""Mediciones de rendimiento del dashboard sobre datos sintéticos."""
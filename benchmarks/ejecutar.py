@@ -0,0 +1,228 @@
+"""Mediciones de carga, agregación y figuras sobre datos sintéticos a varias escalas.
+
+Para cada escala genera (una vez) un CSV con :mod:`benchmarks.sintetico` y mide:
+
+- ``carga/fria``: CSV → caché Parquet → cubo, con el directorio de caché vacío.
+- ``carga/tibia_*``: cubo persistido y filas desde la caché ya válida.
+- ``agregacion/*``: construcción del cubo y cada consulta de cada sección.
+- ``figura/*`` y ``render/*``: construcción de cada figura de la página de
+  análisis y su serialización a JSON (lo que envía ``st.plotly_chart``).
+- ``tabla/*``: filtros, orden y paginación de la página de tabla.
+
+La escala 1× reproduce el tamaño de los datos reales (11 playas, ~5 años,
+un registro diario); cada escala multiplica el número de playas o de registros
+por día. Los resultados se guardan en JSON con el commit y el entorno; con
+``--comparar`` se contrastan contra una corrida anterior::
+
+    python -m benchmarks.ejecutar --escalas 1 10 100 --salida bench/actual.json
+    python -m benchmarks.ejecutar --escalas 1 10 --comparar bench/actual.json
+"""
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+from benchmarks.sintetico import PLAYAS_REALES, generar
+from playas import anomalias, motor, muestreo
+from playas.agregados import construir_cubo_por_bloques
+from playas.almacen import cargar_cubo, cargar_datos
+from playas.carga import cargar_base, iterar_base
+from playas.constantes import MESES
+from playas.paginacion import consultar_pagina
+
+ESCALAS = (1, 10, 100, 1000)
+DIRECTORIO = Path("datos/.bench")
+# Un paso más lento que esta proporción respecto a la corrida previa se marca
+UMBRAL_REGRESION = 1.2
+
+
+def medir(funcion, repeticiones):
+    """Ejecuta ``funcion`` ``repeticiones`` veces; tiempos en segundos."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return {"mediana": statistics.median(tiempos), "minimo": min(tiempos),
+            "repeticiones": repeticiones}
+
+
+def _figuras(cubo, año, mes):
+    # Las mismas llamadas de plotly.express que la página de análisis
+    import plotly.express as px
+
+    def semana(columna):
+        tabla = motor.estadisticas_semana(cubo)
+        return px.bar(x=tabla.index, y=tabla[columna], color=tabla[columna])
+
+    def playa_diario():
+        serie = motor.diario_por_playa(cubo, año, mes)
+        reducida = muestreo.reducir(serie, "fecha", "ocupacion", por="nombre_playa")
+        return px.line(reducida, x="fecha", y="ocupacion", color="nombre_playa",
+                       markers=muestreo.con_marcadores(reducida))
+
+    def playa_anual():
+        serie = motor.anual_por_playa(cubo)
+        reducida = muestreo.reducir(serie, "año", "ocupacion", por="nombre_playa")
+        return px.line(reducida, x="año", y="ocupacion", color="nombre_playa",
+                       markers=muestreo.con_marcadores(reducida))
+
+    return {
+        "temporal/diario": lambda: px.line(motor.serie_diaria(cubo, año, mes), x="fecha",
+                                           y="ocupacion", markers=True),
+        "temporal/mensual": lambda: px.line(motor.serie_mensual(cubo, año), x="mes",
+                                            y="ocupacion", markers=True),
+        "temporal/anual": lambda: px.line(motor.serie_anual(cubo), x="año", y="ocupacion",
+                                          markers=True),
+        "playa/diario": playa_diario,
+        "playa/mensual": lambda: px.line(motor.mensual_por_playa(cubo, año), x="mes",
+                                         y="ocupacion", color="nombre_playa", markers=True),
+        "playa/mapa_calor": lambda: px.imshow(motor.mapa_calor(cubo, año), aspect="auto"),
+        "playa/anual": playa_anual,
+        "semana/total": lambda: semana("sum"),
+        "semana/promedio": lambda: semana("mean"),
+    }
+
+
+def _consultas(cubo, año, mes):
+    return {
+        "temporal/diario": lambda: motor.serie_diaria(cubo, año, mes),
+        "temporal/mensual": lambda: motor.serie_mensual(cubo, año),
+        "temporal/anual": lambda: motor.serie_anual(cubo),
+        "playa/diario": lambda: motor.ranking_playas(motor.diario_por_playa(cubo, año, mes)),
+        "playa/mensual": lambda: motor.mensual_por_playa(cubo, año),
+        "playa/mapa_calor": lambda: motor.mapa_calor(cubo, año, MESES),
+        "playa/anual": lambda: motor.ranking_playas(motor.anual_por_playa(cubo)),
+        "semana/todos": lambda: motor.estadisticas_semana(cubo),
+        "semana/año": lambda: motor.estadisticas_semana(cubo, año),
+        "semana/mes": lambda: motor.estadisticas_semana(cubo, año, mes),
+        "anomalias/deteccion": lambda: anomalias.detectar(cubo),
+    }
+
+
+def _tabla(df):
+    playas = list(df["nombre_playa"].cat.categories[:3])
+    return {
+        "pagina": lambda: consultar_pagina(df, pagina=2),
+        "filtros": lambda: consultar_pagina(df, playas=playas, ocupacion_min=100),
+        "orden_playa": lambda: consultar_pagina(df, orden="nombre_playa", descendente=True),
+        "orden_ocupacion": lambda: consultar_pagina(df, orden="ocupacion", pagina=10),
+    }
+
+
+def correr_escala(escala, directorio, repeticiones, escalar="playas", años=5):
+    playas = len(PLAYAS_REALES) * (escala if escalar == "playas" else 1)
+    registros = escala if escalar == "registros" else 1
+    ruta = directorio / f"ocupacion_{escalar}_x{escala}.csv"
+    if not ruta.exists():
+        generar(ruta, playas=playas, años=años, registros_por_dia=registros)
+    cache = directorio / f"cache_{escalar}_x{escala}"
+
+    def fria():
+        shutil.rmtree(cache, ignore_errors=True)
+        return cargar_cubo(ruta, cache)
+
+    pasos = {"carga/fria": medir(fria, 1)}
+    pasos["carga/tibia_cubo"] = medir(lambda: cargar_cubo(ruta, cache), repeticiones)
+    pasos["carga/tibia_filas"] = medir(lambda: cargar_datos(ruta, cache), repeticiones)
+    pasos["agregacion/cubo"] = medir(
+        lambda: construir_cubo_por_bloques(iterar_base(ruta, cache)), 1)
+
+    cubo = cargar_cubo(ruta, cache)
+    # Un año y mes intermedios, como los que elegiría alguien en el dashboard
+    año = cubo.años[len(cubo.años) // 2]
+    mes = cubo.meses(año)[len(cubo.meses(año)) // 2]
+    for nombre, consulta in _consultas(cubo, año, mes).items():
+        pasos[f"agregacion/{nombre}"] = medir(consulta, repeticiones)
+
+    try:
+        figuras = _figuras(cubo, año, mes)
+    except ImportError:
+        figuras = {}
+    for nombre, construir in figuras.items():
+        pasos[f"figura/{nombre}"] = medir(construir, repeticiones)
+        fig = construir()
+        pasos[f"render/{nombre}"] = medir(fig.to_json, repeticiones)
+
+    df = cargar_base(ruta, cache)
+    for nombre, consulta in _tabla(df).items():
+        pasos[f"tabla/{nombre}"] = medir(consulta, repeticiones)
+
+    return {"playas": playas, "registros_por_dia": registros, "filas": len(df),
+            "csv_bytes": ruta.stat().st_size, "pasos": pasos}
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(actual, previo):
+    """Líneas ``escala paso previo actual proporción`` para los pasos comunes."""
+    lineas = []
+    for escala, resultado in actual["escalas"].items():
+        anterior = previo["escalas"].get(escala)
+        if anterior is None:
+            continue
+        for paso, medida in resultado["pasos"].items():
+            if paso not in anterior["pasos"]:
+                continue
+            antes, ahora = anterior["pasos"][paso]["mediana"], medida["mediana"]
+            proporcion = ahora / antes if antes else float("inf")
+            marca = "  <-- regresión" if proporcion > UMBRAL_REGRESION else ""
+            lineas.append(f"{escala:>5}x {paso:<28} {antes:10.4f}s {ahora:10.4f}s "
+                          f"{proporcion:6.2f}x{marca}")
+    return lineas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mide carga, agregación y figuras a varias escalas.")
+    parser.add_argument("--escalas", type=int, nargs="+", default=list(ESCALAS))
+    parser.add_argument("--escalar", choices=["playas", "registros"], default="playas",
+                        help="qué crece con la escala: número de playas o registros por día")
+    parser.add_argument("--años", type=float, default=5)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--directorio", type=Path, default=DIRECTORIO,
+                        help="dónde se guardan los CSV sintéticos y sus cachés")
+    parser.add_argument("--salida", type=Path, help="archivo JSON de resultados")
+    parser.add_argument("--comparar", type=Path, help="JSON de una corrida anterior")
+    args = parser.parse_args(argv)
+
+    resultados = {
+        "commit": _commit(),
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "pandas": pd.__version__,
+        "plataforma": platform.platform(),
+        "escalar": args.escalar,
+        "escalas": {},
+    }
+    for escala in args.escalas:
+        resultado = correr_escala(escala, args.directorio, args.repeticiones, args.escalar, args.años)
+        resultados["escalas"][str(escala)] = resultado
+        print(f"{escala}x: {resultado['filas']:,} filas")
+        for paso, medida in resultado["pasos"].items():
+            print(f"  {paso:<28} {medida['mediana']:10.4f}s")
+
+    if args.salida:
+        args.salida.parent.mkdir(parents=True, exist_ok=True)
+        args.salida.write_text(json.dumps(resultados, ensure_ascii=False, indent=2), encoding="utf-8")
+    if args.comparar:
+        previo = json.loads(args.comparar.read_text(encoding="utf-8"))
+        print(f"\nComparación contra {previo.get('commit')} ({args.comparar}):")
+        print("\n".join(comparar(resultados, previo)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Generador de datos sintéticos con la forma de ``ocupacion_playas_cancun.csv``.
+
+Produce un CSV con las mismas columnas (``nombre_playa, ocupacion, fecha``) y
+el mismo formato de fecha (``dd/mm/yy``), con estacionalidad mensual y
+semanal y ruido, para medir el dashboard a escalas que los datos reales aún
+no alcanzan. Se escribe por bloques de días, así que la memoria no crece con
+el tamaño del archivo.
+
+    python -m benchmarks.sintetico salida.csv --playas 110 --años 5 --registros-por-dia 24
+"""
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PLAYAS_REALES = [
+    "Ballenas", "Caracol", "Chac-Mool", "Del Niño", "Delfines", "Gaviota Azul",
+    "Langosta", "Las Perlas", "Marlin", "Pez Volador", "Tortugas",
+]
+
+# Factores relativos por mes (temporada alta en invierno, Semana Santa y verano)
+_TEMPORADA = np.array([1.2, 1.1, 1.3, 1.2, 0.8, 0.9, 1.3, 1.2, 0.7, 0.8, 1.0, 1.3])
+# Lunes a domingo
+_SEMANA = np.array([0.85, 0.8, 0.85, 0.9, 1.0, 1.3, 1.4])
+
+
+def nombres_playas(n):
+    """Las playas reales primero; después nombres sintéticos numerados."""
+    extra = [f"Playa {i:05d}" for i in range(max(0, n - len(PLAYAS_REALES)))]
+    return (PLAYAS_REALES + extra)[:n]
+
+
+def generar(ruta, playas=len(PLAYAS_REALES), años=5, registros_por_dia=1,
+            inicio="2021-01-01", semilla=0, filas_por_bloque=1_000_000):
+    """Escribe el CSV sintético en ``ruta`` y devuelve el número de filas."""
+    rng = np.random.default_rng(semilla)
+    nombres = np.array(nombres_playas(playas), dtype=object)
+    # Afluencia base de cada playa, con la dispersión de los datos reales
+    base = rng.lognormal(mean=5.8, sigma=0.8, size=playas)
+
+    dias = pd.date_range(inicio, periods=int(round(365.25 * años)), freq="D")
+    filas_por_dia = playas * registros_por_dia
+    dias_por_bloque = max(1, filas_por_bloque // filas_por_dia)
+
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    filas = 0
+    with open(ruta, "w", encoding="utf-8", newline="") as f:
+        f.write("nombre_playa,ocupacion,fecha\n")
+        for i in range(0, len(dias), dias_por_bloque):
+            bloque = dias[i:i + dias_por_bloque]
+            factor = _TEMPORADA[bloque.month - 1] * _SEMANA[bloque.weekday]
+            media = (factor[:, None, None] * base[None, :, None]
+                     / registros_por_dia * np.ones((1, 1, registros_por_dia)))
+            ocupacion = np.rint(media * rng.gamma(4.0, 0.25, size=media.shape)).astype(np.int32)
+            pd.DataFrame({
+                "nombre_playa": np.tile(np.repeat(nombres, registros_por_dia), len(bloque)),
+                "ocupacion": ocupacion.ravel(),
+                "fecha": np.repeat(bloque.strftime("%d/%m/%y").to_numpy(), filas_por_dia),
+            }).to_csv(f, header=False, index=False)
+            filas += ocupacion.size
+    return filas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos de ocupación de playas.")
+    parser.add_argument("salida", type=Path)
+    parser.add_argument("--playas", type=int, default=len(PLAYAS_REALES))
+    parser.add_argument("--años", type=float, default=5)
+    parser.add_argument("--registros-por-dia", type=int, default=1,
+                        help="conteos por playa y día (24 = horario)")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    filas = generar(args.salida, args.playas, args.años, args.registros_por_dia, semilla=args.semilla)
+    print(f"{filas:,} filas escritas en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
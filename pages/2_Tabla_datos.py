@@ -1,18 +1,146 @@
 import streamlit as st
-import pandas as pd
-from pathlib import Path
 
-st.set_page_config(page_title="Tabla de Datos", layout="wide")
+from playas import instrumentacion
+from playas.almacen import abrir_compartido, version_datos
+from playas.calidad import MOTIVOS, ReporteCalidad, dias_faltantes, duplicados
+from playas.constantes import DATA
+from playas.paginacion import consultar_pagina
 
-ROOT = Path(__file__).resolve().parents[1] 
-DATA = ROOT / "datos" / "ocupacion_playas_cancun.csv"  
+st.set_page_config(page_title="Tabla de Datos", layout="wide")
+medicion = instrumentacion.iniciar("tabla")
 
-if not DATA.exists():
+if version_datos(DATA)[0] is None:
     raise FileNotFoundError(f"No se encontró el archivo de datos en: {DATA}")
 
+@st.cache_resource(max_entries=1)
+def load_data(version):
+    # Filas tipadas del almacén (CSV base + lotes), ordenadas por fecha, sobre
+    # un archivo Arrow mapeado en memoria. cache_resource entrega el mismo
+    # objeto de solo lectura a todas las sesiones, sin copiarlo.
+    instrumentacion.fallo()
+    return abrir_compartido(DATA)
+
+@st.cache_resource(max_entries=1)
+def load_calidad(version):
+    # Lo que se validó al ingerir (guardado junto con la caché de los datos)
+    # más las filas repetidas y los días sin ningún registro, que solo se ven
+    # con los datos completos
+    instrumentacion.fallo()
+    df = load_data(version)
+    return (ReporteCalidad.desde_dict(df.attrs.get("reporte_calidad")), duplicados(df),
+            dias_faltantes(df['fecha']))
+
 st.title("Tabla de datos")
 st.divider()
 st.write("Los datos que exploraremos están disponibles en la siguiente tabla:")
 
-df = pd.read_csv(DATA)
-st.dataframe(df)
+version = version_datos(DATA)
+with instrumentacion.cache("datos"), instrumentacion.tramo("carga"):
+    df = load_data(version)
+
+reporte = df.attrs.get("reporte_fechas", {})
+if reporte.get("descartadas"):
+    st.warning(
+        f"Se descartaron {reporte['descartadas']:,} filas con fecha inválida "
+        f"(p. ej. {', '.join(map(repr, reporte['ejemplos']))})."
+    )
+if reporte.get("normalizadas"):
+    st.caption(f"{reporte['normalizadas']:,} fechas se normalizaron (espacios o separadores '-' / '.').")
+
+with instrumentacion.cache("calidad"), instrumentacion.tramo("calidad"):
+    calidad, (mismo_dia, iguales), faltantes = load_calidad(version)
+if calidad.apartadas:
+    st.warning(f"{calidad.apartadas:,} filas quedaron en cuarentena y no se incluyen en la tabla "
+               "ni en los análisis. Detalle en el reporte de calidad.")
+
+with st.expander("🧪 Reporte de calidad de los datos"):
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Filas validadas", f"{calidad.filas:,}")
+    with col2:
+        st.metric("En cuarentena", f"{calidad.apartadas:,}")
+    with col3:
+        st.metric("Misma playa y día", f"{mismo_dia:,}",
+                  help=f"Filas extra con la misma fecha y playa ({iguales:,} con la misma "
+                       "ocupación); se conservan y se suman.")
+    with col4:
+        st.metric("Días sin registro", f"{len(faltantes):,}")
+
+    for motivo, n in calidad.cuarentena.items():
+        st.markdown(f"**{MOTIVOS[motivo].capitalize()}:** {n:,} filas. Ejemplos:")
+        st.dataframe(calidad.ejemplos.get(motivo, []), hide_index=True, use_container_width=True)
+    if calidad.nombres:
+        st.markdown(f"**Nombres corregidos** ({calidad.corregidas:,} filas): " +
+                    ", ".join(f"{variante!r} → {nombre!r}" for variante, nombre in calidad.nombres.items()))
+    for grupo in calidad.similares:
+        st.warning(f"Posibles variantes del mismo nombre: {', '.join(map(repr, grupo))}.")
+    if len(faltantes):
+        st.markdown(f"**Días sin registro** (primeros 10): "
+                    + ", ".join(f"{dia:%d/%m/%Y}" for dia in faltantes[:10]))
+
+# Filtros y orden: se aplican en el servidor y solo se envía la página visible
+col1, col2, col3 = st.columns([3, 2, 2])
+with col1:
+    playas = st.multiselect("Playas:", sorted(df['nombre_playa'].cat.categories))
+with col2:
+    fecha_min, fecha_max = df['fecha'].iloc[0].date(), df['fecha'].iloc[-1].date()
+    rango = st.date_input("Rango de fechas:", (fecha_min, fecha_max),
+                          min_value=fecha_min, max_value=fecha_max)
+with col3:
+    ocupacion_max = int(df['ocupacion'].max())
+    ocupacion_rango = st.slider("Ocupación (personas):", 0, ocupacion_max, (0, ocupacion_max))
+
+col1, col2, col3 = st.columns([2, 2, 2])
+columnas_orden = {"Fecha": "fecha", "Playa": "nombre_playa", "Ocupación": "ocupacion", "Día de la semana": "dia_semana"}
+with col1:
+    orden = st.selectbox("Ordenar por:", list(columnas_orden))
+with col2:
+    descendente = st.radio("Sentido:", ["Ascendente", "Descendente"], horizontal=True) == "Descendente"
+with col3:
+    tamano = st.selectbox("Filas por página:", [25, 50, 100, 250], index=1)
+
+# Mientras el usuario elige el rango, date_input devuelve solo la fecha inicial
+desde, hasta = (*rango, None)[:2]
+
+with instrumentacion.tramo("filtro"):
+    resultado = consultar_pagina(
+        df,
+        playas=playas,
+        desde=desde,
+        hasta=hasta,
+        ocupacion_min=ocupacion_rango[0],
+        ocupacion_max=ocupacion_rango[1],
+        orden=columnas_orden[orden],
+        descendente=descendente,
+        pagina=st.session_state.get("tabla_pagina", 1),
+        tamano=tamano,
+    )
+
+with instrumentacion.tramo("render"):
+    st.dataframe(
+        resultado.filas,
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "fecha": st.column_config.DateColumn("Fecha", format="DD/MM/YYYY"),
+            "nombre_playa": "Playa",
+            "ocupacion": st.column_config.NumberColumn("Ocupación", format="%d"),
+            "dia_semana": "Día de la semana",
+        },
+    )
+
+# Si los filtros reducen el resultado, la página guardada se ajusta al rango
+st.session_state["tabla_pagina"] = resultado.pagina
+col1, col2 = st.columns([1, 3])
+with col1:
+    st.number_input("Página:", min_value=1, max_value=resultado.paginas, key="tabla_pagina")
+with col2:
+    if resultado.total:
+        st.caption(f"Mostrando filas {resultado.inicio + 1:,}–{resultado.inicio + len(resultado.filas):,} "
+                   f"de {resultado.total:,} (página {resultado.pagina} de {resultado.paginas})")
+    else:
+        st.caption("No hay filas que cumplan los filtros.")
+
+
+instrumentacion.terminar()
+instrumentacion.panel(st.sidebar, medicion)
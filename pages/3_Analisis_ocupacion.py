@@ -1,72 +1,92 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 import calendar
-import numpy as np
-from pathlib import Path
+import json
 
-ROOT = Path(__file__).resolve().parents[1]
-DATA = ROOT / "datos" / "ocupacion_playas_cancun.csv"
+from playas import anomalias, instrumentacion, motor, muestreo, pronostico, sql
+from playas.almacen import cargar_cubo, version_datos
+from playas.constantes import DATA
+from playas.figuras import CacheFiguras
+from playas.indice import rango_fechas
 
 
 st.set_page_config(page_title="Análisis de Ocupación de Playas", layout="wide")
+medicion = instrumentacion.iniciar("analisis")
 st.title("Dashboard de Análisis de Ocupación de Playas")
 
-@st.cache_data
-def load_data():
+@st.cache_resource(max_entries=1)
+def load_cubo(version):
+    # 'version' (tamaño y mtime del CSV y del manifiesto de lotes) solo sirve
+    # como llave de la caché de Streamlit; el almacén valida además el hash.
+    # El cubo se comparte entre sesiones: las consultas de motor devuelven
+    # tablas nuevas y nunca lo modifican.
+    instrumentacion.fallo()
+    # Solo los errores de la fuente (archivo ilegible o sin el esquema
+    # esperado); las filas inválidas ya quedaron en cuarentena al ingerir
     try:
-        # Lee 'fecha' como texto para controlar el parseo nosotros
-        df = pd.read_csv(DATA, dtype={"fecha": "string"})
-
-        # Normaliza separadores y espacios (por si vienen con '-' o '.')
-        s = df["fecha"].str.strip().str.replace(r"[-.]", "/", regex=True)
-
-        # Paso 1: intenta dd/mm/yyyy
-        f = pd.to_datetime(s, format="%d/%m/%Y", errors="coerce")
-
-        # Paso 2 (solo donde falló): intenta dd/mm/yy
-        m = f.isna()
-        if m.any():
-            f.loc[m] = pd.to_datetime(s[m], format="%d/%m/%y", errors="coerce")
-
-        # Si aún quedaran NaT, puedes agregar más formatos aquí:
-        # m2 = f.isna()
-        # f.loc[m2] = pd.to_datetime(s[m2], format="%Y/%m/%d", errors="coerce")
-
-        df["fecha"] = f
-        df = df.dropna(subset=["fecha"])
-
-        # Derivados
-        dias_semana_es = {
-            0: "Lunes", 1: "Martes", 2: "Miércoles", 3: "Jueves",
-            4: "Viernes", 5: "Sábado", 6: "Domingo"
-        }
-        df["año"] = df["fecha"].dt.year
-        df["mes"] = df["fecha"].dt.month
-        df["dia_semana"] = df["fecha"].dt.weekday.map(dias_semana_es)
-
-        # Nombre de mes en español
-        meses_es = {
-            1:"Enero",2:"Febrero",3:"Marzo",4:"Abril",5:"Mayo",6:"Junio",
-            7:"Julio",8:"Agosto",9:"Septiembre",10:"Octubre",11:"Noviembre",12:"Diciembre"
-        }
-        df["mes_nombre"] = df["mes"].map(meses_es)
-
-        return df
-    except Exception as e:
+        return cargar_cubo(DATA)
+    except (OSError, ValueError) as e:
         st.error(f"Error al cargar los datos: {str(e)}")
         return None
 
+@st.cache_resource(max_entries=1)
+def load_base(version):
+    # Base SQL de esta versión de los datos; cada sesión abre su conexión
+    instrumentacion.fallo()
+    try:
+        return sql.abrir_base(DATA)
+    except (OSError, ValueError) as e:
+        st.error(f"Error al abrir la base SQL: {str(e)}")
+        return None
+
+@st.cache_resource(max_entries=1)
+def load_modelo(version):
+    # Parámetros del pronóstico ajustados a esta versión de los datos
+    instrumentacion.fallo()
+    return pronostico.cargar_modelo(DATA)
+
+@st.cache_resource(max_entries=1)
+def load_anomalias(version):
+    # Picos, caídas y huecos detectados en esta versión de los datos
+    instrumentacion.fallo()
+    return anomalias.cargar_anomalias(DATA)
+
+@st.cache_resource
+def cache_figuras():
+    # Una sola caché por proceso, compartida por todas las sesiones
+    return CacheFiguras()
+
+def figura(vista, construir):
+    # La versión de los datos va en la llave: un lote nuevo invalida las figuras.
+    # 'construir' solo corre si la figura no estaba en la caché; por eso cada
+    # 'construir' importa Plotly ahí mismo y no al inicio de la página.
+    def construir_medido():
+        instrumentacion.fallo()
+        return construir()
+    with instrumentacion.cache("figuras"), instrumentacion.tramo("figura"):
+        return cache_figuras().obtener((version, *vista), construir_medido)
+
+def mostrar(fig):
+    # 'fig' es el JSON guardado en la caché. Streamlit valida y serializa lo
+    # que recibe; un dict le ahorra convertir la figura (to_dict) antes.
+    with instrumentacion.tramo("render"):
+        st.plotly_chart(json.loads(fig), use_container_width=True)
+
 # Cargar datos
-df = load_data()
+version = version_datos(DATA)
+# Con PLAYAS_SQL las vistas se resuelven como consultas en la base SQL; la
+# base expone años, meses y playas como el cubo, así que 'cubo' puede ser
+# cualquiera de los dos
+consultas = sql if sql.activo() else motor
+with instrumentacion.cache("datos"), instrumentacion.tramo("carga"):
+    cubo = load_base(version) if sql.activo() else load_cubo(version)
 
-if df is not None:
+if cubo is not None:
     # Sidebar para navegación
     st.sidebar.title("Navegación")
     seccion = st.sidebar.selectbox(
         "Selecciona el análisis:",
-        ["Análisis Temporal", "Análisis por Playa", "Análisis por Día de la Semana"]
+        ["Análisis Temporal", "Análisis por Playa", "Análisis por Día de la Semana", "Pronóstico",
+         "Anomalías", "Consulta SQL"]
     )
     
     # ======================
@@ -85,7 +105,7 @@ if df is not None:
         
         if tipo_vista == "Diario":
             with col2:
-                año_sel = st.selectbox("Año:", sorted(df['año'].unique()))
+                año_sel = st.selectbox("Año:", cubo.años)
             with col3:
                 mes_sel = st.selectbox(
                     "Mes:", 
@@ -93,116 +113,128 @@ if df is not None:
                     format_func=lambda x: calendar.month_name[x]
                 )
             
-            # Filtrar datos
-            df_filtrado = df[(df['año'] == año_sel) & (df['mes'] == mes_sel)]
-            serie = df_filtrado.groupby('fecha', as_index=False)['ocupacion'].sum()
+            with instrumentacion.tramo("agregacion"):
+                serie = consultas.serie_diaria(cubo, año_sel, mes_sel)
             
             if not serie.empty:
-                fig = px.line(
-                    serie,
-                    x='fecha',
-                    y='ocupacion',
-                    markers=True,
-                    title=f'📊 Ocupación Diaria - {calendar.month_name[mes_sel]} {año_sel}',
-                    labels={'fecha': 'Fecha', 'ocupacion': 'Ocupación Total (personas)'}
-                )
-                fig.update_layout(
-                    xaxis_title="Fecha",
-                    yaxis_title="Ocupación (personas)",
-                    hovermode='x unified'
-                )
-                st.plotly_chart(fig, use_container_width=True)
+                def construir():
+                    import plotly.express as px
+                    fig = px.line(
+                        serie,
+                        x='fecha',
+                        y='ocupacion',
+                        markers=True,
+                        title=f'📊 Ocupación Diaria - {calendar.month_name[mes_sel]} {año_sel}',
+                        labels={'fecha': 'Fecha', 'ocupacion': 'Ocupación Total (personas)'}
+                    )
+                    fig.update_layout(
+                        xaxis_title="Fecha",
+                        yaxis_title="Ocupación (personas)",
+                        hovermode='x unified'
+                    )
+                    return fig
+                fig = figura(("temporal", "Diario", año_sel, mes_sel), construir)
+                mostrar(fig)
                 
                 # Estadísticas del período
+                resumen = motor.resumen_serie(serie, 'fecha')
                 st.subheader("📊 Estadísticas del Período")
                 col1, col2, col3, col4 = st.columns(4)
                 with col1:
-                    st.metric("Total", f"{serie['ocupacion'].sum():,}")
+                    st.metric("Total", f"{resumen['total']:,}")
                 with col2:
-                    st.metric("Promedio Diario", f"{serie['ocupacion'].mean():,.0f}")
+                    st.metric("Promedio Diario", f"{resumen['promedio']:,.0f}")
                 with col3:
-                    st.metric("Máximo", f"{serie['ocupacion'].max():,}")
+                    st.metric("Máximo", f"{resumen['maximo']:,}")
                 with col4:
-                    st.metric("Mínimo", f"{serie['ocupacion'].min():,}")
+                    st.metric("Mínimo", f"{resumen['minimo']:,}")
             else:
                 st.warning("No hay datos disponibles para el período seleccionado.")
         
         elif tipo_vista == "Mensual":
             with col2:
-                año_sel = st.selectbox("Año:", sorted(df['año'].unique()))
+                año_sel = st.selectbox("Año:", cubo.años)
             
-            # Filtrar por año y agrupar por mes
-            df_año = df[df['año'] == año_sel]
-            serie = (df_año.groupby('mes', as_index=False)['ocupacion']
-                    .sum()
-                    .sort_values('mes'))
-            serie['mes_nombre'] = serie['mes'].apply(lambda x: calendar.month_name[x])
+            with instrumentacion.tramo("agregacion"):
+                serie = consultas.serie_mensual(cubo, año_sel)
+                serie['mes_nombre'] = serie['mes'].apply(lambda x: calendar.month_name[x])
             
             if not serie.empty:
-                fig = px.line(
-                    serie,
-                    x='mes_nombre',
-                    y='ocupacion',
-                    markers=True,
-                    title=f'📊 Ocupación Mensual - {año_sel}',
-                    labels={'mes_nombre': 'Mes', 'ocupacion': 'Ocupación Total (personas)'}
-                )
-                fig.update_layout(
-                    xaxis_title="Mes",
-                    yaxis_title="Ocupación (personas)",
-                    hovermode='x unified'
-                )
-                st.plotly_chart(fig, use_container_width=True)
+                def construir():
+                    import plotly.express as px
+                    fig = px.line(
+                        serie,
+                        x='mes_nombre',
+                        y='ocupacion',
+                        markers=True,
+                        title=f'📊 Ocupación Mensual - {año_sel}',
+                        labels={'mes_nombre': 'Mes', 'ocupacion': 'Ocupación Total (personas)'}
+                    )
+                    fig.update_layout(
+                        xaxis_title="Mes",
+                        yaxis_title="Ocupación (personas)",
+                        hovermode='x unified'
+                    )
+                    return fig
+                fig = figura(("temporal", "Mensual", año_sel), construir)
+                mostrar(fig)
                 
                 # Estadísticas del año
+                resumen = motor.resumen_serie(serie, 'mes_nombre')
                 st.subheader("📊 Estadísticas del Año")
                 col1, col2, col3, col4 = st.columns(4)
                 with col1:
-                    st.metric("Total Anual", f"{serie['ocupacion'].sum():,}")
+                    st.metric("Total Anual", f"{resumen['total']:,}")
                 with col2:
-                    st.metric("Promedio Mensual", f"{serie['ocupacion'].mean():,.0f}")
+                    st.metric("Promedio Mensual", f"{resumen['promedio']:,.0f}")
                 with col3:
-                    st.metric("Mejor Mes", f"{serie.loc[serie['ocupacion'].idxmax(), 'mes_nombre']}")
+                    st.metric("Mejor Mes", f"{resumen['mejor']}")
                 with col4:
-                    st.metric("Menor Mes", f"{serie.loc[serie['ocupacion'].idxmin(), 'mes_nombre']}")
+                    st.metric("Menor Mes", f"{resumen['peor']}")
             else:
                 st.warning("No hay datos disponibles para el año seleccionado.")
         
         else:  # Anual
-            serie = df.groupby('año', as_index=False)['ocupacion'].sum()
+            with instrumentacion.tramo("agregacion"):
+                serie = consultas.serie_anual(cubo)
             
-            fig = px.line(
-                serie,
-                x='año',
-                y='ocupacion',
-                markers=True,
-                title='📊 Ocupación Anual - Serie Histórica',
-                labels={'año': 'Año', 'ocupacion': 'Ocupación Total (personas)'}
-            )
-            fig.update_layout(
-                xaxis_title="Año",
-                yaxis_title="Ocupación (personas)",
-                hovermode='x unified'
-            )
-            fig.update_xaxes(dtick=1)
-            st.plotly_chart(fig, use_container_width=True)
+            def construir():
+                import plotly.express as px
+                fig = px.line(
+                    serie,
+                    x='año',
+                    y='ocupacion',
+                    markers=True,
+                    title='📊 Ocupación Anual - Serie Histórica',
+                    labels={'año': 'Año', 'ocupacion': 'Ocupación Total (personas)'}
+                )
+                fig.update_layout(
+                    xaxis_title="Año",
+                    yaxis_title="Ocupación (personas)",
+                    hovermode='x unified'
+                )
+                fig.update_xaxes(dtick=1)
+                return fig
+            fig = figura(("temporal", "Anual"), construir)
+            mostrar(fig)
             
             # Estadísticas históricas
+            resumen = motor.resumen_serie(serie, 'año')
             st.subheader("📊 Estadísticas Históricas")
             col1, col2, col3, col4 = st.columns(4)
             with col1:
-                st.metric("Total Histórico", f"{serie['ocupacion'].sum():,}")
+                st.metric("Total Histórico", f"{resumen['total']:,}")
             with col2:
-                st.metric("Promedio Anual", f"{serie['ocupacion'].mean():,.0f}")
+                st.metric("Promedio Anual", f"{resumen['promedio']:,.0f}")
             with col3:
-                st.metric("Mejor Año", f"{serie.loc[serie['ocupacion'].idxmax(), 'año']}")
+                st.metric("Mejor Año", f"{resumen['mejor']}")
             with col4:
-                st.metric("Crecimiento", f"{((serie['ocupacion'].iloc[-1] / serie['ocupacion'].iloc[0] - 1) * 100):.1f}%")
+                st.metric("Crecimiento", f"{resumen['crecimiento']:.1f}%")
     
     # ======================
     # SECCIÓN 2: ANÁLISIS POR PLAYA
     # ======================
-    elif seccion == "🏖️ Análisis por Playa":
+    elif seccion == "Análisis por Playa":
         st.header("🏖️ Análisis de Ocupación por Playa")
         
         col1, col2, col3 = st.columns([2, 2, 2])
@@ -213,13 +245,10 @@ if df is not None:
                 ["Diario", "Mensual", "Anual"],
                 key="playa_temporal"
             )
-        
-        # Obtener lista de playas disponibles
-        playas_disponibles = sorted(df['nombre_playa'].unique()) if 'nombre_playa' in df.columns else ['Todas las playas']
 
         if tipo_vista == "Diario":
             with col2:
-                año_sel = st.selectbox("Año:", sorted(df['año'].unique()), key="playa_año")
+                año_sel = st.selectbox("Año:", cubo.años, key="playa_año")
             with col3:
                 mes_sel = st.selectbox(
                     "Mes:", 
@@ -228,50 +257,77 @@ if df is not None:
                     key="playa_mes"
                 )
             
-            # Filtrar datos por período
-            df_filtrado = df[(df['año'] == año_sel) & (df['mes'] == mes_sel)]
+            with instrumentacion.tramo("agregacion"):
+                serie = consultas.diario_por_playa(cubo, año_sel, mes_sel)
             
-            if 'nombre_playa' in df.columns:
-                serie = df_filtrado.groupby(['fecha', 'nombre_playa'], as_index=False)['ocupacion'].sum()
+            if not serie.empty:
+                with instrumentacion.cache("anomalias"), instrumentacion.tramo("carga"):
+                    deteccion = load_anomalias(version)
+                # Si entre todas las playas hay más puntos que el presupuesto de
+                # la figura se reducen con LTTB; al acercar un rango se vuelve a
+                # reducir con más detalle
+                visible, zoom = serie, None
+                if muestreo.necesita_reduccion(serie, por='nombre_playa'):
+                    fecha_ini = serie['fecha'].iloc[0].to_pydatetime()
+                    fecha_fin = serie['fecha'].iloc[-1].to_pydatetime()
+                    zoom = st.slider("🔍 Acercar:", min_value=fecha_ini, max_value=fecha_fin,
+                                     value=(fecha_ini, fecha_fin), key="playa_zoom")
+                    inicio, fin = rango_fechas(serie, *zoom)
+                    visible = serie.iloc[inicio:fin]
                 
-                if not serie.empty:
+                def construir():
+                    import plotly.express as px
+                    reducida = muestreo.reducir(visible, 'fecha', 'ocupacion', por='nombre_playa')
                     fig = px.line(
-                        serie,
+                        reducida,
                         x='fecha',
                         y='ocupacion',
                         color='nombre_playa',
-                        markers=True,
+                        markers=muestreo.con_marcadores(reducida),
                         title=f'🏖️ Ocupación por Playa - {calendar.month_name[mes_sel]} {año_sel}',
                         labels={'fecha': 'Fecha', 'ocupacion': 'Ocupación (personas)', 'playa': 'Playa'}
                     )
-                    st.plotly_chart(fig, use_container_width=True)
-                    
-                    # Ranking de playas
-                    ranking = df_filtrado.groupby('nombre_playa')['ocupacion'].sum().sort_values(ascending=False)
-                    st.subheader("🏆 Ranking de Playas")
-                    
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.bar_chart(ranking.head(10))
-                    with col2:
-                        for i, (nombre_playa, ocupacion) in enumerate(ranking.head(5).items()):
-                            st.metric(f"{i+1}. {nombre_playa}", f"{ocupacion:,} personas")
-                else:
-                    st.warning("No hay datos disponibles para el período seleccionado.")
+                    # Anomalías detectadas en el rango visible
+                    marcadas = anomalias.en_periodo(deteccion.anomalias, visible['fecha'].iloc[0],
+                                                    visible['fecha'].iloc[-1])
+                    if not marcadas.empty:
+                        fig.add_scatter(
+                            x=marcadas['fecha'], y=marcadas['ocupacion'], mode='markers',
+                            name='Anomalía',
+                            marker=dict(symbol='x', size=11, color='red'),
+                            customdata=marcadas[['nombre_playa', 'tipo', 'esperado']],
+                            hovertemplate='%{customdata[0]}: %{customdata[1]}<br>'
+                                          '%{y:,} personas (esperado %{customdata[2]:,})<extra></extra>'
+                        )
+                    return fig
+                fig = figura(("playa", "Diario", año_sel, mes_sel, zoom), construir)
+                mostrar(fig)
+                
+                # Ranking de playas
+                with instrumentacion.tramo("agregacion"):
+                    ranking = motor.ranking_playas(serie)
+                st.subheader("🏆 Ranking de Playas")
+                
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.bar_chart(ranking.head(10))
+                with col2:
+                    for i, (nombre_playa, ocupacion) in enumerate(ranking.head(5).items()):
+                        st.metric(f"{i+1}. {nombre_playa}", f"{ocupacion:,} personas")
             else:
-                st.info("La columna 'nombre_playa' no está disponible en los datos.")
+                st.warning("No hay datos disponibles para el período seleccionado.")
 
         elif tipo_vista == "Mensual":
             with col2:
-                año_sel = st.selectbox("Año:", sorted(df['año'].unique()), key="playa_año_m")
+                año_sel = st.selectbox("Año:", cubo.años, key="playa_año_m")
             
-            df_año = df[df['año'] == año_sel]
-
-            if 'nombre_playa' in df.columns:
-                serie = df_año.groupby(['mes', 'nombre_playa'], as_index=False)['ocupacion'].sum()
+            with instrumentacion.tramo("agregacion"):
+                serie = consultas.mensual_por_playa(cubo, año_sel)
                 serie['mes_nombre'] = serie['mes'].apply(lambda x: calendar.month_name[x])
-                
-                if not serie.empty:
+            
+            if not serie.empty:
+                def construir():
+                    import plotly.express as px
                     fig = px.line(
                         serie,
                         x='mes_nombre',
@@ -281,10 +337,14 @@ if df is not None:
                         title=f'🏖️ Ocupación Mensual por Playa - {año_sel}',
                         labels={'mes_nombre': 'Mes', 'ocupacion': 'Ocupación (personas)', 'nombre_playa': 'Playa'}
                     )
-                    st.plotly_chart(fig, use_container_width=True)
-                    
-                    # Heatmap de ocupación
-                    pivot_data = serie.pivot(index='nombre_playa', columns='mes_nombre', values='ocupacion').fillna(0)
+                    return fig
+                fig = figura(("playa", "Mensual", año_sel), construir)
+                mostrar(fig)
+                
+                # Heatmap de ocupación
+                def construir():
+                    import plotly.express as px
+                    pivot_data = consultas.mapa_calor(cubo, año_sel, calendar.month_name[1:])
                     
                     fig_heatmap = px.imshow(
                         pivot_data,
@@ -292,49 +352,53 @@ if df is not None:
                         title="🔥 Mapa de Calor - Ocupación por Playa y Mes",
                         labels=dict(x="Mes", y="Playa", color="Ocupación")
                     )
-                    st.plotly_chart(fig_heatmap, use_container_width=True)
-                else:
-                    st.warning("No hay datos disponibles para el año seleccionado.")
+                    return fig_heatmap
+                fig_heatmap = figura(("playa", "Mensual-calor", año_sel), construir)
+                mostrar(fig_heatmap)
             else:
-                st.info("La columna 'playa' no está disponible en los datos.")
+                st.warning("No hay datos disponibles para el año seleccionado.")
         
         else:  # Anual
-            if 'nombre_playa' in df.columns:
-                serie = df.groupby(['año', 'nombre_playa'], as_index=False)['ocupacion'].sum()
-                
+            with instrumentacion.tramo("agregacion"):
+                serie = consultas.anual_por_playa(cubo)
+            
+            def construir():
+                import plotly.express as px
+                reducida = muestreo.reducir(serie, 'año', 'ocupacion', por='nombre_playa')
                 fig = px.line(
-                    serie,
+                    reducida,
                     x='año',
                     y='ocupacion',
                     color='nombre_playa',
-                    markers=True,
+                    markers=muestreo.con_marcadores(reducida),
                     title='🏖️ Ocupación Anual por Playa - Serie Histórica',
                     labels={'año': 'Año', 'ocupacion': 'Ocupación (personas)', 'nombre_playa': 'Playa'}
                 )
                 fig.update_xaxes(dtick=1)
-                st.plotly_chart(fig, use_container_width=True)
-                
-                # Totales históricos por playa
-                totales = df.groupby('nombre_playa')['ocupacion'].sum().sort_values(ascending=False)
-                st.subheader("🏆 Totales Históricos por Playa")
-                st.bar_chart(totales)
-            else:
-                st.info("La columna 'nombre_playa' no está disponible en los datos.")
+                return fig
+            fig = figura(("playa", "Anual"), construir)
+            mostrar(fig)
+            
+            # Totales históricos por playa
+            with instrumentacion.tramo("agregacion"):
+                totales = motor.ranking_playas(serie)
+            st.subheader("🏆 Totales Históricos por Playa")
+            st.bar_chart(totales)
 
     # ======================
     # SECCIÓN 3: ANÁLISIS POR DÍA DE LA SEMANA
     # ======================
-    else:  # Análisis por Día de la Semana
+    elif seccion == "Análisis por Día de la Semana":
         st.header("📅 Análisis por Día de la Semana")
         # Filtros opcionales
         col1, col2 = st.columns(2)
         with col1:
-            años_disponibles = sorted(df['año'].unique())
+            años_disponibles = cubo.años
             año_filtro = st.selectbox("Filtrar por año:", ['Todos'] + años_disponibles)
         
         with col2:
             if año_filtro != 'Todos':
-                meses_disponibles = sorted(df[df['año'] == año_filtro]['mes'].unique())
+                meses_disponibles = cubo.meses(año_filtro)
                 mes_filtro = st.selectbox(
                     "Filtrar por mes:", 
                     ['Todos'] + [calendar.month_name[m] for m in meses_disponibles],
@@ -344,45 +408,46 @@ if df is not None:
                 mes_filtro = 'Todos'
         
         # Aplicar filtros
-        df_filtrado = df.copy()
-        if año_filtro != 'Todos':
-            df_filtrado = df_filtrado[df_filtrado['año'] == año_filtro]
-        if mes_filtro != 'Todos':
-            mes_num = list(calendar.month_name).index(mes_filtro)
-            df_filtrado = df_filtrado[df_filtrado['mes'] == mes_num]
-        
-        # Agrupar por día de la semana
-        ocupacion_por_dia = df_filtrado.groupby('dia_semana')['ocupacion'].agg([
-            'sum', 'mean', 'median', 'std', 'min', 'max', 'count'
-        ]).round(2)
+        año_num = None if año_filtro == 'Todos' else año_filtro
+        mes_num = None if mes_filtro == 'Todos' else list(calendar.month_name).index(mes_filtro)
         
-        # Ordenar días de la semana
-        orden_dias = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
-        ocupacion_por_dia = ocupacion_por_dia.reindex(orden_dias)
+        # Estadísticas por día de la semana (ya ordenadas de lunes a domingo)
+        with instrumentacion.tramo("agregacion"):
+            ocupacion_por_dia = consultas.estadisticas_semana(cubo, año_num, mes_num)
+            insights = motor.insights_semana(ocupacion_por_dia)
+        orden_dias = list(ocupacion_por_dia.index)
         
         # Gráfico principal
-        fig = px.bar(
-            x=ocupacion_por_dia.index,
-            y=ocupacion_por_dia['sum'],
-            title='📊 Ocupación Total por Día de la Semana',
-            labels={'x': 'Día de la Semana', 'y': 'Ocupación Total (personas)'},
-            color=ocupacion_por_dia['sum'],
-            color_continuous_scale='Blues'
-        )
-        fig.update_layout(showlegend=False, xaxis_title="Día de la Semana", yaxis_title="Ocupación Total")
-        st.plotly_chart(fig, use_container_width=True)
+        def construir():
+            import plotly.express as px
+            fig = px.bar(
+                x=ocupacion_por_dia.index,
+                y=ocupacion_por_dia['sum'],
+                title='📊 Ocupación Total por Día de la Semana',
+                labels={'x': 'Día de la Semana', 'y': 'Ocupación Total (personas)'},
+                color=ocupacion_por_dia['sum'],
+                color_continuous_scale='Blues'
+            )
+            fig.update_layout(showlegend=False, xaxis_title="Día de la Semana", yaxis_title="Ocupación Total")
+            return fig
+        fig = figura(("semana", "total", año_num, mes_num), construir)
+        mostrar(fig)
         
         # Gráfico de promedio
-        fig_promedio = px.bar(
-            x=ocupacion_por_dia.index,
-            y=ocupacion_por_dia['mean'],
-            title='📈 Ocupación Promedio por Día de la Semana',
-            labels={'x': 'Día de la Semana', 'y': 'Ocupación Promedio (personas)'},
-            color=ocupacion_por_dia['mean'],
-            color_continuous_scale='Greens'
-        )
-        fig_promedio.update_layout(showlegend=False, xaxis_title="Día de la Semana", yaxis_title="Ocupación Promedio")
-        st.plotly_chart(fig_promedio, use_container_width=True)
+        def construir():
+            import plotly.express as px
+            fig_promedio = px.bar(
+                x=ocupacion_por_dia.index,
+                y=ocupacion_por_dia['mean'],
+                title='📈 Ocupación Promedio por Día de la Semana',
+                labels={'x': 'Día de la Semana', 'y': 'Ocupación Promedio (personas)'},
+                color=ocupacion_por_dia['mean'],
+                color_continuous_scale='Greens'
+            )
+            fig_promedio.update_layout(showlegend=False, xaxis_title="Día de la Semana", yaxis_title="Ocupación Promedio")
+            return fig_promedio
+        fig_promedio = figura(("semana", "promedio", año_num, mes_num), construir)
+        mostrar(fig_promedio)
         
         # Estadísticas detalladas
         st.subheader("📊 Estadísticas Detalladas por Día")
@@ -403,8 +468,7 @@ if df is not None:
                         st.metric("Mínimo", f"{ocupacion_por_dia.loc[dia, 'min']:.0f}")
                     with col4:
                         st.metric("Desv. Estándar", f"{ocupacion_por_dia.loc[dia, 'std']:.0f}")
-                        variabilidad = (ocupacion_por_dia.loc[dia, 'std'] / ocupacion_por_dia.loc[dia, 'mean']) * 100
-                        st.metric("Variabilidad (%)", f"{variabilidad:.1f}%")
+                        st.metric("Variabilidad (%)", f"{insights['variabilidad'][dia]:.1f}%")
         
         # Tabla resumen
         st.subheader("📋 Tabla Resumen")
@@ -415,9 +479,9 @@ if df is not None:
         
         # Insights automáticos
         st.subheader("💡 Insights Automáticos")
-        dia_mas_ocupado = ocupacion_por_dia['sum'].idxmax()
-        dia_menos_ocupado = ocupacion_por_dia['sum'].idxmin()
-        dia_mas_variable = ocupacion_por_dia['std'].idxmax()
+        dia_mas_ocupado = insights['dia_mas_ocupado']
+        dia_menos_ocupado = insights['dia_menos_ocupado']
+        dia_mas_variable = insights['dia_mas_variable']
         
         col1, col2, col3 = st.columns(3)
         with col1:
@@ -427,5 +491,166 @@ if df is not None:
         with col3:
             st.info(f"📊 **Día más variable:** {dia_mas_variable}\n\nDesv. Std: {ocupacion_por_dia.loc[dia_mas_variable, 'std']:.0f}")
 
+    # ======================
+    # SECCIÓN 4: PRONÓSTICO
+    # ======================
+    elif seccion == "Pronóstico":
+        st.header("🔮 Pronóstico de Ocupación por Playa")
+        st.caption("Modelo por playa con tendencia y estacionalidad semanal y mensual, "
+                   "ajustado sobre la ocupación diaria histórica.")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            playa_sel = st.selectbox("Playa:", cubo.playas, key="pronostico_playa")
+        with col2:
+            dias = st.slider("Días a pronosticar:", 7, 60, 14, key="pronostico_dias")
+
+        with instrumentacion.cache("pronostico"), instrumentacion.tramo("carga"):
+            modelo = load_modelo(version)
+        with instrumentacion.tramo("agregacion"):
+            tabla = pronostico.pronosticar(modelo, dias)
+            resumen_p = pronostico.resumen_pronostico(tabla)
+
+        def construir():
+            import plotly.graph_objects as go
+            historia = consultas.diario_por_playa(cubo, *cubo.años[-1:], cubo.meses(cubo.años[-1])[-1])
+            historia = historia[historia['nombre_playa'] == playa_sel]
+            futuro = tabla[tabla['nombre_playa'] == playa_sel]
+            fig = go.Figure([
+                go.Scatter(x=futuro['fecha'], y=futuro['superior'], line=dict(width=0),
+                           showlegend=False, hoverinfo='skip'),
+                go.Scatter(x=futuro['fecha'], y=futuro['inferior'], line=dict(width=0),
+                           fill='tonexty', fillcolor='rgba(99, 110, 250, 0.2)',
+                           name='Intervalo 90%'),
+                go.Scatter(x=historia['fecha'], y=historia['ocupacion'], mode='lines+markers',
+                           name='Observado'),
+                go.Scatter(x=futuro['fecha'], y=futuro['pronostico'], mode='lines+markers',
+                           name='Pronóstico', line=dict(dash='dash')),
+            ])
+            fig.update_layout(
+                title=f'🔮 {playa_sel} - próximos {dias} días',
+                xaxis_title="Fecha",
+                yaxis_title="Ocupación (personas)",
+                hovermode='x unified'
+            )
+            return fig
+        fig = figura(("pronostico", playa_sel, dias), construir)
+        mostrar(fig)
+
+        fila = resumen_p.loc[playa_sel]
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Total esperado", f"{fila['total']:,.0f}")
+        with col2:
+            st.metric("Día pico", f"{fila['dia_pico']:%d/%m/%Y}")
+        with col3:
+            st.metric("Pico (cota superior 90%)", f"{fila['pico']:,.0f} ({fila['pico_superior']:,.0f})")
+
+        st.subheader("📋 Todas las playas")
+        st.dataframe(
+            resumen_p,
+            use_container_width=True,
+            column_config={
+                "total": st.column_config.NumberColumn("Total esperado", format="%d"),
+                "dia_pico": st.column_config.DateColumn("Día pico", format="DD/MM/YYYY"),
+                "pico": st.column_config.NumberColumn("Pico", format="%d"),
+                "pico_superior": st.column_config.NumberColumn("Pico (cota superior)", format="%d"),
+            },
+        )
+
+    # ======================
+    # SECCIÓN 5: ANOMALÍAS
+    # ======================
+    elif seccion == "Anomalías":
+        st.header("⚠️ Anomalías y Huecos por Playa")
+        st.caption("Días cuya ocupación se aleja de la mediana móvil de la playa (ya descontado "
+                   "el efecto del día de la semana), y días sin registro.")
+
+        with instrumentacion.cache("anomalias"), instrumentacion.tramo("carga"):
+            deteccion = load_anomalias(version)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            playa_filtro = st.selectbox("Playa:", ['Todas'] + cubo.playas, key="anomalias_playa")
+        with col2:
+            tipos = st.multiselect("Tipo:", ["pico", "caida"], default=["pico", "caida"],
+                                   key="anomalias_tipo")
+
+        with instrumentacion.tramo("filtro"):
+            tabla = deteccion.anomalias[deteccion.anomalias['tipo'].isin(tipos)]
+            huecos = deteccion.huecos
+            if playa_filtro != 'Todas':
+                tabla = tabla[tabla['nombre_playa'] == playa_filtro]
+                huecos = huecos[huecos['nombre_playa'] == playa_filtro]
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Picos", f"{(tabla['tipo'] == 'pico').sum():,}")
+        with col2:
+            st.metric("Caídas", f"{(tabla['tipo'] == 'caida').sum():,}")
+        with col3:
+            st.metric("Días sin registro", f"{huecos['dias'].sum():,}")
+
+        st.subheader("📋 Ranking de Anomalías")
+        st.dataframe(
+            tabla,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "fecha": st.column_config.DateColumn("Fecha", format="DD/MM/YYYY"),
+                "nombre_playa": "Playa",
+                "tipo": "Tipo",
+                "ocupacion": st.column_config.NumberColumn("Ocupación", format="%d"),
+                "esperado": st.column_config.NumberColumn("Esperado", format="%d"),
+                "puntaje": st.column_config.NumberColumn("Puntaje", format="%.1f"),
+            },
+        )
+
+        st.subheader("🕳️ Huecos en los Registros")
+        if huecos.empty:
+            st.success("No hay días sin registro.")
+        else:
+            st.dataframe(
+                huecos,
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "nombre_playa": "Playa",
+                    "desde": st.column_config.DateColumn("Desde", format="DD/MM/YYYY"),
+                    "hasta": st.column_config.DateColumn("Hasta", format="DD/MM/YYYY"),
+                    "dias": st.column_config.NumberColumn("Días", format="%d"),
+                },
+            )
+
+    # ======================
+    # SECCIÓN 6: CONSULTA SQL
+    # ======================
+    else:  # Consulta SQL
+        st.header("🗄️ Consulta SQL")
+        with instrumentacion.cache("base_sql"), instrumentacion.tramo("carga"):
+            base = load_base(version)
+
+        if base is not None:
+            st.caption(f"Una sola sentencia SELECT sobre la tabla `{sql.TABLA}` "
+                       "(fecha, año, mes, dia_semana 0 = lunes, nombre_playa, ocupacion). "
+                       f"Motor: {base.motor}; máximo {sql.LIMITE_FILAS:,} filas y "
+                       f"{sql.TIEMPO_MAXIMO} s por consulta.")
+            ejemplo = st.selectbox("Ejemplo:", list(sql.EJEMPLOS), key="sql_ejemplo")
+            consulta = st.text_area("Consulta:", sql.EJEMPLOS[ejemplo], height=200, key="sql_consulta")
+
+            if st.button("Ejecutar", key="sql_ejecutar"):
+                try:
+                    with instrumentacion.tramo("agregacion"):
+                        resultado, truncada = sql.consulta_libre(base, consulta)
+                except (ValueError, TimeoutError) as e:
+                    st.error(f"No se pudo ejecutar la consulta: {e}")
+                else:
+                    st.dataframe(resultado, use_container_width=True, hide_index=True)
+                    if truncada:
+                        st.caption(f"Se muestran las primeras {sql.LIMITE_FILAS:,} filas.")
+
 else:
-    st.error("No se pudieron cargar los datos. Verifica que el archivo CSV esté en la ruta correcta.")
\ No newline at end of file
+    st.error("No se pudieron cargar los datos. Verifica que el archivo CSV esté en la ruta correcta.")
+
+instrumentacion.terminar()
+instrumentacion.panel(st.sidebar, medicion, {"figuras": cache_figuras().estadisticas()})
@@ -0,0 +1,5 @@
+"""Utilidades de carga y análisis de la ocupación de playas de Cancún.
+
+Este paquete concentra la lógica que no depende de Streamlit para que las
+páginas del dashboard solo se encarguen de la presentación.
+"""
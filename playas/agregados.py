@@ -0,0 +1,309 @@
+"""Cubo de agregados precalculados para las vistas del dashboard.
+
+Se construye una sola vez al cargar los datos. Las secciones responden desde
+estas tablas pequeñas en lugar de filtrar y agrupar las filas crudas en cada
+rerun de Streamlit.
+"""
+from dataclasses import dataclass, fields
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from playas import cuantiles
+from playas.carga import escribir_parquet
+from playas.constantes import DIAS_SEMANA
+from playas.indice import rango_periodo, rebanar_periodo
+
+# Columnas de la tabla de estadísticas por día de la semana, en el orden que
+# espera la página de análisis.
+ESTADISTICAS = ["sum", "mean", "median", "std", "min", "max", "count"]
+
+
+@dataclass
+class Cubo:
+    # Total diario global: fecha, año, mes, ocupacion
+    total_diario: pd.DataFrame
+    # Totales por playa: fecha/mes/año × nombre_playa
+    diario: pd.DataFrame
+    mensual: pd.DataFrame
+    anual: pd.DataFrame
+    # Momentos de Welford por (año, mes, dia_semana): count, sum, mean, m2, min, max
+    semanal: pd.DataFrame
+    # Centroides (valor, peso) por (año, mes, dia_semana) para la mediana;
+    # ver playas.cuantiles
+    cuantiles: pd.DataFrame
+
+    @property
+    def años(self):
+        return sorted(self.anual["año"].unique().tolist())
+
+    def meses(self, año):
+        mensual = self.mensual
+        return sorted(mensual.loc[mensual["año"] == año, "mes"].unique().tolist())
+
+    @property
+    def playas(self):
+        return sorted(self.anual["nombre_playa"].unique().tolist())
+
+
+def construir_cubo(df):
+    """Construye todas las tablas del cubo a partir de las filas crudas."""
+    ocupacion = df["ocupacion"].astype("int64")
+    base = df[["fecha", "año", "mes", "dia_semana", "nombre_playa"]].assign(ocupacion=ocupacion)
+
+    diario = (base.groupby(["fecha", "nombre_playa"], observed=True, as_index=False)
+              ["ocupacion"].sum())
+    diario.insert(1, "año", diario["fecha"].dt.year.astype("int16"))
+    diario.insert(2, "mes", diario["fecha"].dt.month.astype("int8"))
+
+    return Cubo(
+        total_diario=_total_diario(diario),
+        diario=diario,
+        mensual=(diario.groupby(["año", "mes", "nombre_playa"], observed=True, as_index=False)
+                 ["ocupacion"].sum()),
+        anual=(diario.groupby(["año", "nombre_playa"], observed=True, as_index=False)
+               ["ocupacion"].sum()),
+        semanal=_momentos(base),
+        cuantiles=cuantiles.desde_valores(base, _CELDA),
+    )
+
+
+def construir_cubo_por_bloques(bloques):
+    """Construye el cubo incorporando los bloques uno a uno.
+
+    Solo un bloque de filas crudas está en memoria a la vez; lo que se
+    acumula son los agregados, cuyo tamaño no depende del número de filas.
+    """
+    cubo = None
+    for bloque in bloques:
+        if cubo is None:
+            cubo = construir_cubo(bloque)
+        elif len(bloque):
+            cubo = actualizar_cubo(cubo, bloque)
+    return cubo
+
+
+def _total_diario(diario):
+    return (diario.groupby(["fecha", "año", "mes"], as_index=False)["ocupacion"].sum())
+
+
+# Celda de los acumuladores por día de la semana
+_CELDA = ["año", "mes", "dia_semana"]
+_MOMENTOS = ["count", "sum", "mean", "m2", "min", "max"]
+
+
+def _momentos(base):
+    momentos = (base.groupby(_CELDA, observed=True)["ocupacion"]
+                .agg(["size", "sum", "mean", "var", "min", "max"])
+                .reset_index()
+                .rename(columns={"size": "count"}))
+    # M2 = suma de cuadrados de las desviaciones a la media (Welford)
+    momentos["m2"] = (momentos.pop("var") * (momentos["count"] - 1)).fillna(0.0)
+    return momentos[_CELDA + _MOMENTOS]
+
+
+def combinar_momentos(tabla, llaves):
+    """Combina momentos de Welford de varias piezas agrupando por ``llaves``.
+
+    Fórmula de Chan para k piezas: n = Σnᵢ, media = Σnᵢ·mediaᵢ / n y
+    M2 = ΣM2ᵢ + Σnᵢ·(mediaᵢ − media)². A diferencia de acumular Σx², no
+    pierde precisión cuando la media es grande respecto a la dispersión.
+    """
+    ponderada = tabla.assign(_nm=tabla["count"] * tabla["mean"])
+    grupos = ponderada.groupby(llaves, observed=True)
+    media = grupos["_nm"].transform("sum") / grupos["count"].transform("sum")
+    ponderada["_m2"] = tabla["m2"] + tabla["count"] * (tabla["mean"] - media) ** 2
+
+    combinada = (ponderada.groupby(llaves, observed=True, as_index=False)
+                 .agg(count=("count", "sum"), sum=("sum", "sum"), _nm=("_nm", "sum"),
+                      m2=("_m2", "sum"), min=("min", "min"), max=("max", "max")))
+    combinada["mean"] = combinada.pop("_nm") / combinada["count"]
+    return combinada[[*llaves, *_MOMENTOS]]
+
+
+# Llaves y reglas de combinación de cada tabla: todas son agregados
+# combinables, así que agregar datos nuevos solo requiere reagrupar las
+# particiones (año o año/mes) que tocan. Las reglas son un dict para
+# ``DataFrame.agg`` o una función ``(tabla, llaves) -> tabla`` combinada.
+_COMBINACION = {
+    "total_diario": (["fecha", "año", "mes"], {"ocupacion": "sum"}),
+    "diario": (["fecha", "año", "mes", "nombre_playa"], {"ocupacion": "sum"}),
+    "mensual": (["año", "mes", "nombre_playa"], {"ocupacion": "sum"}),
+    "anual": (["año", "nombre_playa"], {"ocupacion": "sum"}),
+    "semanal": (_CELDA, combinar_momentos),
+    "cuantiles": (_CELDA, cuantiles.combinar),
+}
+
+
+def actualizar_cubo(cubo, lote):
+    """Devuelve un cubo nuevo con las filas de ``lote`` incorporadas.
+
+    Solo se reagrupan las particiones afectadas (los días, meses y años del
+    lote); el resto de cada tabla se reutiliza tal cual.
+    """
+    nuevo = construir_cubo(lote)
+    tablas = {}
+    for campo in fields(Cubo):
+        nombre = campo.name
+        llaves, reglas = _COMBINACION[nombre]
+        vieja, agregada = _unificar_playas(getattr(cubo, nombre), getattr(nuevo, nombre))
+        tablas[nombre] = _fusionar(vieja, agregada, llaves, reglas)
+    return Cubo(**tablas)
+
+
+def combinar_cubos(cubos):
+    """Combina cubos de fuentes distintas (p. ej. un archivo por playa) en uno.
+
+    A diferencia de :func:`actualizar_cubo`, las fuentes pueden traslaparse en
+    cualquier periodo: cada tabla se concatena y se reagrupa completa.
+    """
+    tablas = {}
+    for campo in fields(Cubo):
+        nombre = campo.name
+        llaves, reglas = _COMBINACION[nombre]
+        partes = _unificar_playas(*(getattr(cubo, nombre) for cubo in cubos))
+        todas = pd.concat(partes, ignore_index=True)
+        if callable(reglas):
+            combinada = reglas(todas, llaves)
+        else:
+            combinada = todas.groupby(llaves, observed=True, as_index=False).agg(reglas)
+        tablas[nombre] = combinada[list(partes[0].columns)]
+    return Cubo(**tablas)
+
+
+def _unificar_playas(*tablas):
+    if "nombre_playa" not in tablas[0].columns:
+        return list(tablas)
+    playas = union_categoricals([tabla["nombre_playa"] for tabla in tablas]).categories
+    return [tabla.assign(nombre_playa=tabla["nombre_playa"].cat.set_categories(playas))
+            for tabla in tablas]
+
+
+def _fusionar(vieja, nueva, llaves, reglas):
+    particion = ["año", "mes"] if "mes" in llaves else ["año"]
+    piezas, cursor = [], 0
+    for periodo, filas_nuevas in nueva.groupby(particion, sort=True):
+        inicio, fin = rango_periodo(vieja, *periodo)
+        piezas.append(vieja.iloc[cursor:inicio])
+        bloque = pd.concat([vieja.iloc[inicio:fin], filas_nuevas], ignore_index=True)
+        if callable(reglas):
+            piezas.append(reglas(bloque, llaves))
+        else:
+            piezas.append(bloque.groupby(llaves, observed=True, as_index=False).agg(reglas))
+        cursor = fin
+    piezas.append(vieja.iloc[cursor:])
+    return pd.concat(piezas, ignore_index=True)[list(vieja.columns)]
+
+
+class CuboEnDisco(Cubo):
+    """Cubo persistido cuyas tablas se leen de disco la primera vez que se usan.
+
+    Una sección que solo consulta ``total_diario`` no paga la lectura ni la
+    memoria de ``diario`` o ``cuantiles``. Una vez leída, la tabla queda como
+    atributo normal.
+    """
+
+    def __init__(self, directorio):
+        self.directorio = Path(directorio)
+
+    def __getattr__(self, nombre):
+        # Solo se llama si el atributo no existe: la tabla aún no se ha leído
+        if nombre not in _TABLAS:
+            raise AttributeError(nombre)
+        tabla = pd.read_parquet(self.directorio / f"{nombre}.parquet")
+        setattr(self, nombre, tabla)
+        return tabla
+
+
+_TABLAS = [campo.name for campo in fields(Cubo)]
+
+
+def guardar_cubo(cubo, directorio):
+    for nombre in _TABLAS:
+        escribir_parquet(getattr(cubo, nombre), Path(directorio) / f"{nombre}.parquet")
+
+
+def leer_cubo(directorio):
+    """Cubo guardado en ``directorio``; sus tablas se leen al usarse (:class:`CuboEnDisco`).
+
+    Falla de inmediato con ``FileNotFoundError`` si falta alguna tabla (p. ej.
+    un cubo de una versión anterior del esquema).
+    """
+    cubo = CuboEnDisco(directorio)
+    for nombre in _TABLAS:
+        if not (cubo.directorio / f"{nombre}.parquet").is_file():
+            raise FileNotFoundError(cubo.directorio / f"{nombre}.parquet")
+    return cubo
+
+
+def _filtrar(tabla, año=None, mes=None):
+    # Todas las tablas del cubo salen de groupby, que las deja ordenadas por
+    # (año, mes, ...): el periodo es un rango contiguo.
+    return rebanar_periodo(tabla, año, mes)
+
+
+# ----------------------------------------------------------------------
+# Consultas usadas por las secciones del dashboard
+# ----------------------------------------------------------------------
+
+def serie_diaria(cubo, año, mes):
+    return _filtrar(cubo.total_diario, año, mes)[["fecha", "ocupacion"]].reset_index(drop=True)
+
+
+def serie_mensual(cubo, año):
+    return (_filtrar(cubo.mensual, año)
+            .groupby("mes", as_index=False)["ocupacion"].sum()
+            .sort_values("mes"))
+
+
+def serie_anual(cubo):
+    return cubo.anual.groupby("año", as_index=False)["ocupacion"].sum()
+
+
+def diario_por_playa(cubo, año, mes):
+    return _filtrar(cubo.diario, año, mes)[["fecha", "nombre_playa", "ocupacion"]]
+
+
+def mensual_por_playa(cubo, año):
+    return _filtrar(cubo.mensual, año)[["mes", "nombre_playa", "ocupacion"]].reset_index(drop=True)
+
+
+def anual_por_playa(cubo):
+    return cubo.anual[["año", "nombre_playa", "ocupacion"]]
+
+
+def matriz_diaria(cubo):
+    """Ocupación diaria como matriz días × playas, con todos los días del rango.
+
+    Los días sin registro de una playa quedan en NaN.
+    """
+    matriz = cubo.diario.pivot_table(index="fecha", columns="nombre_playa", values="ocupacion",
+                                     aggfunc="sum", observed=True)
+    fechas = pd.date_range(matriz.index.min(), matriz.index.max(), freq="D")
+    return matriz.reindex(fechas)
+
+
+def ranking_playas(tabla):
+    """Ocupación acumulada por playa, de mayor a menor, sobre cualquier tabla del cubo."""
+    return (tabla.groupby("nombre_playa", observed=True)["ocupacion"].sum()
+            .sort_values(ascending=False))
+
+
+def estadisticas_semana(cubo, año=None, mes=None):
+    """Suma, promedio, mediana, desviación, mínimo, máximo y conteo por día.
+
+    Equivale a ``df.groupby('dia_semana')['ocupacion'].agg(ESTADISTICAS)`` sobre
+    las filas crudas filtradas, pero combina los acumuladores de las celdas
+    (año, mes, día) del periodo: a lo más 7 × 12 × años resúmenes pequeños.
+    La mediana es exacta mientras las celdas no rebasen
+    ``cuantiles.CENTROIDES`` valores distintos y aproximada después.
+    """
+    m = combinar_momentos(_filtrar(cubo.semanal, año, mes), ["dia_semana"]).set_index("dia_semana")
+    n = m["count"]
+    # Desviación muestral (ddof=1), igual que pandas
+    m["std"] = np.sqrt(m["m2"] / (n - 1)).where(n > 1)
+    m["median"] = cuantiles.mediana(_filtrar(cubo.cuantiles, año, mes), "dia_semana")
+
+    return m[ESTADISTICAS].reindex(DIAS_SEMANA).round(2)
@@ -0,0 +1,316 @@
+"""Almacén columnar de la ocupación: CSV base más lotes diarios anexados.
+
+Los contadores entregan un archivo nuevo cada día. En vez de reescribir el CSV
+y reprocesar toda la historia, cada lote se valida, se guarda como Parquet en
+``datos/.cache/lotes/`` y se incorpora al cubo de agregados persistido en
+``datos/.cache/cubo/`` actualizando solo sus particiones (día, mes y año).
+
+Un manifiesto JSON registra la huella del CSV base, los lotes incorporados en
+orden y el subdirectorio del cubo vigente. Cada versión del cubo se escribe
+en un subdirectorio nuevo y el manifiesto es lo último que se reemplaza, así
+que un lote a medias nunca queda visible.
+
+Junto al Parquet de cada lote se guarda su CSV original: si cambia
+``VERSION_ESQUEMA`` los lotes se vuelven a procesar en lugar de perderse.
+
+Uso desde la línea de comandos::
+
+    python -m playas.almacen lote_2025-07-31.csv [lote_2025-08-01.csv ...]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+from playas import agregados, particiones
+from playas.calidad import ReporteCalidad
+from playas.carga import (VERSION_ESQUEMA, abrir_arrow, cargar_base, concatenar,
+                          escribir_arrow, escribir_arrow_por_bloques, escribir_parquet,
+                          hash_archivo, huella_archivo, iterar_base, leer_csv, retipar)
+from playas.carga import version_datos as _version_csv
+from playas.constantes import CACHE_DIR, DATA
+from playas.indice import ordenar_por_fecha
+from playas.instrumentacion import tramo
+
+
+def _rutas(cache_dir):
+    cache_dir = Path(cache_dir)
+    return cache_dir / "manifiesto.json", cache_dir / "lotes", cache_dir / "cubo"
+
+
+def _leer_json(ruta):
+    try:
+        return json.loads(ruta.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def leer_manifiesto(cache_dir=CACHE_DIR):
+    """Manifiesto vigente; ``None`` si todavía no hay almacén.
+
+    Un manifiesto de otra versión del esquema se migra: sus lotes se vuelven
+    a procesar y el cubo se reconstruye.
+    """
+    ruta, _, _ = _rutas(cache_dir)
+    manifiesto = _leer_json(ruta)
+    if manifiesto is None or manifiesto.get("version") == VERSION_ESQUEMA:
+        return manifiesto
+    return _migrar(manifiesto, cache_dir)
+
+
+def _migrar(manifiesto, cache_dir):
+    # Sin la llave "cubo" el cubo de la versión anterior ya no se usa
+    _, dir_lotes, _ = _rutas(cache_dir)
+    lotes = []
+    for lote in manifiesto.get("lotes", []):
+        crudo = dir_lotes / f"{lote['hash']}.csv"
+        if crudo.exists():
+            filas = leer_csv(crudo)
+        else:
+            filas = retipar(pd.read_parquet(dir_lotes / f"{lote['hash']}.parquet"))
+        escribir_parquet(filas, dir_lotes / f"{lote['hash']}.parquet")
+        lotes.append(_entrada_lote(lote["hash"], lote["archivo"], filas))
+    migrado = {"version": VERSION_ESQUEMA, "base": manifiesto["base"], "lotes": lotes}
+    _escribir_manifiesto(migrado, cache_dir)
+    return migrado
+
+
+def _escribir_manifiesto(manifiesto, cache_dir):
+    ruta, _, _ = _rutas(cache_dir)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_suffix(f".{os.getpid()}.tmp")
+    temporal.write_text(json.dumps(manifiesto, indent=2), encoding="utf-8")
+    os.replace(temporal, ruta)
+
+
+def _version_base(ruta):
+    return particiones.version(ruta) if particiones.es_particionada(ruta) else _version_csv(ruta)
+
+
+def _huella_base(ruta):
+    return particiones.huella(ruta) if particiones.es_particionada(ruta) else huella_archivo(ruta)
+
+
+def version_datos(ruta=DATA, cache_dir=CACHE_DIR):
+    """Llave barata del estado del almacén: versión del CSV y del manifiesto.
+
+    ``ruta`` puede ser un CSV o una fuente particionada (directorio o glob).
+    """
+    ruta_manifiesto, _, _ = _rutas(cache_dir)
+    return _version_base(ruta), _version_csv(ruta_manifiesto)
+
+
+def _publicar(cubo, manifiesto, cache_dir):
+    """Escribe el cubo en un subdirectorio nuevo y luego apunta el manifiesto a él."""
+    ruta, _, dir_cubo = _rutas(cache_dir)
+    lotes = manifiesto["lotes"]
+    # Un manifiesto nuevo nunca deja fuera lotes que ya estaban anexados
+    anterior = _leer_json(ruta) or {}
+    perdidos = {lote["hash"] for lote in anterior.get("lotes", [])} - {lote["hash"] for lote in lotes}
+    if perdidos:
+        raise ValueError(f"El manifiesto nuevo perdería {len(perdidos)} lotes anexados")
+    ultimo = lotes[-1]["hash"] if lotes else manifiesto["base"]["hash"]
+    manifiesto["cubo"] = f"{len(lotes):06d}-{ultimo[:12]}"
+    agregados.guardar_cubo(cubo, dir_cubo / manifiesto["cubo"])
+    _escribir_manifiesto(manifiesto, cache_dir)
+
+    # Se conserva también la versión anterior: quien la tenga abierta lee sus
+    # tablas al usarlas (agregados.CuboEnDisco) hasta que recargue
+    anteriores = sorted((d for d in dir_cubo.iterdir() if d.name != manifiesto["cubo"]),
+                        key=lambda d: d.stat().st_mtime_ns, reverse=True)
+    for anterior in anteriores[1:]:
+        shutil.rmtree(anterior, ignore_errors=True)
+
+
+def _base_vigente(manifiesto, ruta):
+    # El CSV base cambió (se reemplazó a mano): los lotes se conservan pero el
+    # cubo persistido ya no es válido. Si la fuente ya no existe tampoco lo
+    # es: la reconstrucción reporta el archivo faltante.
+    base = manifiesto["base"]
+    version = _version_base(ruta)
+    if version is None:
+        return False
+    tamano, mtime_ns = version
+    if (base["tamano"], base["mtime_ns"]) == (tamano, mtime_ns):
+        return True
+    return base["tamano"] == tamano and base["hash"] == _huella_base(ruta)["hash"]
+
+
+def _leer_lotes(manifiesto, cache_dir):
+    _, dir_lotes, _ = _rutas(cache_dir)
+    for lote in manifiesto["lotes"]:
+        yield pd.read_parquet(dir_lotes / f"{lote['hash']}.parquet")
+
+
+def cargar_datos(ruta=DATA, cache_dir=CACHE_DIR):
+    """Filas tipadas del CSV base más todos los lotes anexados, ordenadas por fecha.
+
+    Una fuente particionada (directorio o glob) se parsea en paralelo; ver
+    :mod:`playas.particiones`.
+    """
+    if particiones.es_particionada(ruta):
+        base = particiones.cargar_base_particionada(ruta, cache_dir)
+    else:
+        base = cargar_base(ruta, cache_dir)
+    manifiesto = leer_manifiesto(cache_dir)
+    if not manifiesto or not manifiesto["lotes"]:
+        return base
+
+    df = concatenar([base, *_leer_lotes(manifiesto, cache_dir)])
+    if not df["fecha"].is_monotonic_increasing:
+        # Algún lote rellenó días anteriores al final de la historia
+        df = ordenar_por_fecha(df)
+    return df
+
+
+def version_contenido(ruta=DATA, cache_dir=CACHE_DIR):
+    """Hash corto del contenido vigente: esquema, CSV base y lotes anexados.
+
+    Nombra los derivados de las filas (archivo compartido, base SQL), que se
+    materializan una vez por versión.
+    """
+    manifiesto = leer_manifiesto(cache_dir)
+    lotes = [lote["hash"] for lote in manifiesto["lotes"]] if manifiesto else []
+    clave = json.dumps([VERSION_ESQUEMA, _huella_base(ruta)["hash"], lotes])
+    return hashlib.blake2b(clave.encode(), digest_size=8).hexdigest()
+
+
+def abrir_compartido(ruta=DATA, cache_dir=CACHE_DIR):
+    """Las filas de :func:`cargar_datos` como DataFrame de solo lectura compartido.
+
+    Se materializan una vez por versión de los datos en un archivo Arrow
+    (``datos/.cache/compartido/<version>.arrow``) que se mapea en memoria: las
+    sesiones y los procesos que lo abren leen las mismas páginas en lugar de
+    tener cada uno su copia. El archivo se escribe por bloques desde
+    :func:`iterar_datos`, sin tener la historia completa en memoria; solo si
+    algún lote rellenó días anteriores se cargan y ordenan todas las filas.
+    Si no se puede escribir en disco se devuelven las filas en memoria.
+    """
+    version = version_contenido(ruta, cache_dir)
+    directorio = Path(cache_dir) / "compartido"
+    archivo = directorio / f"{version}.arrow"
+
+    if not archivo.exists():
+        try:
+            if not escribir_arrow_por_bloques(iterar_datos(ruta, cache_dir), archivo):
+                escribir_arrow(cargar_datos(ruta, cache_dir), archivo)
+        except OSError:
+            return cargar_datos(ruta, cache_dir)
+        # En POSIX quien ya tenga mapeada una versión anterior la conserva
+        # hasta soltarla; en Windows el archivo sigue bloqueado y se deja.
+        for anterior in directorio.glob("*.arrow"):
+            if anterior != archivo:
+                try:
+                    anterior.unlink()
+                except OSError:
+                    pass
+    return abrir_arrow(archivo)
+
+
+def iterar_datos(ruta=DATA, cache_dir=CACHE_DIR):
+    """Recorre por bloques el CSV base y después cada lote anexado."""
+    if particiones.es_particionada(ruta):
+        yield from particiones.iterar_base_particionada(ruta, cache_dir)
+    else:
+        yield from iterar_base(ruta, cache_dir)
+    manifiesto = leer_manifiesto(cache_dir)
+    if manifiesto:
+        yield from _leer_lotes(manifiesto, cache_dir)
+
+
+def cargar_cubo(ruta=DATA, cache_dir=CACHE_DIR):
+    """Cubo de agregados persistido; se reconstruye solo si cambió el CSV base.
+
+    El cubo persistido se abre sin leer sus tablas: cada una se lee al
+    consultarla por primera vez. La reconstrucción recorre los datos por
+    bloques, así que no necesita tener la historia completa en memoria.
+    """
+    _, _, dir_cubo = _rutas(cache_dir)
+    manifiesto = leer_manifiesto(cache_dir)
+    if manifiesto and "cubo" in manifiesto and _base_vigente(manifiesto, ruta):
+        try:
+            with tramo("leer_cubo"):
+                return agregados.leer_cubo(dir_cubo / manifiesto["cubo"])
+        except OSError:
+            pass
+
+    with tramo("construir_cubo"):
+        if particiones.es_particionada(ruta):
+            # Un cubo por archivo en paralelo; los lotes se incorporan después
+            cubo = particiones.construir_cubo_particionado(ruta, cache_dir)
+            for lote in _leer_lotes(manifiesto, cache_dir) if manifiesto else []:
+                cubo = agregados.actualizar_cubo(cubo, lote)
+        else:
+            cubo = agregados.construir_cubo_por_bloques(iterar_datos(ruta, cache_dir))
+    lotes = manifiesto["lotes"] if manifiesto else []
+    try:
+        _publicar(cubo, {"version": VERSION_ESQUEMA, "base": _huella_base(ruta), "lotes": lotes},
+                  cache_dir)
+    except OSError:
+        pass
+    return cubo
+
+
+def anexar_lote(ruta_lote, ruta=DATA, cache_dir=CACHE_DIR):
+    """Valida e incorpora un lote nuevo. Devuelve el número de filas anexadas.
+
+    Anexar dos veces el mismo archivo no tiene efecto (se reconoce por su hash).
+    """
+    _, dir_lotes, _ = _rutas(cache_dir)
+    huella = hash_archivo(ruta_lote)
+    cubo = cargar_cubo(ruta, cache_dir)
+    manifiesto = leer_manifiesto(cache_dir)
+    if manifiesto is None:
+        raise OSError(f"No se pudo escribir el almacén en {cache_dir}")
+    if any(lote["hash"] == huella for lote in manifiesto["lotes"]):
+        return 0
+
+    lote = leer_csv(ruta_lote)
+    if lote.empty:
+        raise ValueError(f"{Path(ruta_lote).name}: ninguna fila tiene fecha válida y pasa la validación")
+
+    # El CSV original permite volver a procesar el lote si cambia el esquema
+    dir_lotes.mkdir(parents=True, exist_ok=True)
+    temporal = dir_lotes / f"{huella}.{os.getpid()}.tmp"
+    shutil.copyfile(ruta_lote, temporal)
+    os.replace(temporal, dir_lotes / f"{huella}.csv")
+    escribir_parquet(lote, dir_lotes / f"{huella}.parquet")
+    manifiesto["lotes"].append(_entrada_lote(huella, Path(ruta_lote).name, lote))
+    _publicar(agregados.actualizar_cubo(cubo, lote), manifiesto, cache_dir)
+    return len(lote)
+
+
+def _entrada_lote(huella, archivo, lote):
+    return {
+        "hash": huella,
+        "archivo": archivo,
+        "filas": len(lote),
+        "descartadas": lote.attrs["reporte_fechas"]["descartadas"],
+        "cuarentena": ReporteCalidad.desde_dict(lote.attrs["reporte_calidad"]).apartadas,
+        "desde": lote["fecha"].min().date().isoformat() if len(lote) else None,
+        "hasta": lote["fecha"].max().date().isoformat() if len(lote) else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Anexa lotes diarios de ocupación al almacén del dashboard."
+    )
+    parser.add_argument("lotes", nargs="+", type=Path, help="archivos CSV con nombre_playa, ocupacion y fecha")
+    args = parser.parse_args(argv)
+
+    for ruta_lote in args.lotes:
+        try:
+            filas = anexar_lote(ruta_lote)
+        except ValueError as e:
+            print(f"{ruta_lote.name}: rechazado ({e})")
+            continue
+        print(f"{ruta_lote.name}: {filas} filas anexadas" if filas else f"{ruta_lote.name}: sin cambios")
+
+
+if __name__ == "__main__":
+    main()
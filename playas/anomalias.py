@@ -0,0 +1,171 @@
+"""Detección de picos, caídas y huecos en la serie diaria de cada playa.
+
+Todas las playas se revisan a la vez sobre la matriz días × playas del cubo
+(``agregados.matriz_diaria``), en escala ``log(1 + ocupación)``:
+
+1. Se resta el efecto del día de la semana de cada playa (mediana histórica
+   por día), para que un sábado lleno no cuente como pico.
+2. Sobre ese residuo se calculan la mediana y la MAD móviles en una ventana
+   centrada de ``VENTANA`` días. La MAD móvil es la mediana móvil de
+   ``|residuo − mediana móvil|``, una aproximación que evita una segunda
+   pasada por ventana.
+3. El puntaje robusto ``(residuo − mediana) / (1.4826 · MAD)`` marca como
+   ``pico`` o ``caida`` los días que rebasan ``UMBRAL``.
+
+Los huecos son los días sin registro de una playa entre su primer y su
+último día con datos, agrupados en tramos consecutivos.
+
+El resultado se guarda junto a las tablas del cubo vigente
+(``datos/.cache/cubo/<versión>/anomalias.parquet`` y ``huecos.parquet``), así
+que se recalcula una vez por versión de los datos y desaparece con ella::
+
+    python -m playas.anomalias --top 20
+"""
+import argparse
+from dataclasses import dataclass, fields
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from playas.agregados import matriz_diaria
+from playas.almacen import cargar_cubo, leer_manifiesto
+from playas.carga import escribir_parquet
+from playas.constantes import CACHE_DIR, DATA
+
+VENTANA = 29  # días, centrada
+UMBRAL = 3.5
+# Días con dato mínimos en la ventana para calificar un día
+_MINIMO = 7
+# Piso de la MAD (escala log, ~5 %): en tramos casi constantes cualquier
+# variación daría puntajes enormes
+_MAD_MINIMA = 0.05
+_ESCALA_MAD = 1.4826
+
+
+@dataclass
+class Deteccion:
+    # fecha, nombre_playa, tipo (pico/caida), ocupacion, esperado, puntaje;
+    # de mayor a menor |puntaje|
+    anomalias: pd.DataFrame
+    # nombre_playa, desde, hasta, dias; de mayor a menor duración
+    huecos: pd.DataFrame
+
+
+def detectar(cubo, ventana=VENTANA, umbral=UMBRAL):
+    """Picos, caídas y huecos de todas las playas a partir de la tabla ``diario``."""
+    matriz = matriz_diaria(cubo)
+    valores = np.log1p(matriz)
+
+    # Efecto del día de la semana por playa, restado a cada día
+    dia = matriz.index.weekday
+    efecto = valores.groupby(dia).median().reindex(range(7)).fillna(0.0).to_numpy()[dia]
+    residuo = valores - efecto
+
+    movil = residuo.rolling(ventana, center=True, min_periods=_MINIMO)
+    mediana = movil.median()
+    mad = ((residuo - mediana).abs()
+           .rolling(ventana, center=True, min_periods=_MINIMO).median())
+    puntaje = (residuo - mediana) / (_ESCALA_MAD * mad.clip(lower=_MAD_MINIMA))
+
+    dias, playas = np.nonzero((puntaje.abs() > umbral).to_numpy())
+    valor_puntaje = puntaje.to_numpy()[dias, playas]
+    esperado = np.expm1((mediana.to_numpy() + efecto)[dias, playas])
+    anomalias = pd.DataFrame({
+        "fecha": matriz.index[dias],
+        "nombre_playa": _playas(matriz, playas),
+        "tipo": np.where(valor_puntaje > 0, "pico", "caida"),
+        "ocupacion": matriz.to_numpy()[dias, playas].astype("int64"),
+        "esperado": esperado.round().astype("int64"),
+        "puntaje": valor_puntaje.round(2),
+    })
+    orden = np.argsort(-np.abs(valor_puntaje), kind="stable")
+    return Deteccion(anomalias=anomalias.iloc[orden].reset_index(drop=True),
+                     huecos=_huecos(matriz))
+
+
+def _huecos(matriz):
+    faltantes = matriz.isna()
+    # Solo cuentan los días entre el primer y el último registro de cada playa
+    activos = (~faltantes).cummax() & (~faltantes)[::-1].cummax()[::-1]
+    playas, dias = np.nonzero((faltantes & activos).to_numpy().T)
+    # Orden por (playa, día): un tramo nuevo empieza al cambiar de playa o
+    # cuando el día no sigue al anterior
+    nuevo = np.ones(len(dias), dtype=bool)
+    nuevo[1:] = (playas[1:] != playas[:-1]) | (dias[1:] != dias[:-1] + 1)
+    ultimo = np.ones(len(dias), dtype=bool)
+    ultimo[:-1] = nuevo[1:]
+    inicio, fin = np.flatnonzero(nuevo), np.flatnonzero(ultimo)
+
+    huecos = pd.DataFrame({
+        "nombre_playa": _playas(matriz, playas[inicio]),
+        "desde": matriz.index[dias[inicio]],
+        "hasta": matriz.index[dias[fin]],
+        "dias": (fin - inicio + 1).astype("int64"),
+    })
+    return huecos.sort_values(["dias", "desde"], ascending=[False, True], ignore_index=True)
+
+
+def _playas(matriz, columnas):
+    # Nombres de las columnas indicadas, con las playas de la matriz como categorías
+    return pd.Categorical.from_codes(columnas, matriz.columns.astype(str))
+
+
+def guardar(deteccion, directorio):
+    for campo in fields(Deteccion):
+        escribir_parquet(getattr(deteccion, campo.name), Path(directorio) / f"{campo.name}.parquet")
+
+
+def leer(directorio):
+    return Deteccion(**{
+        campo.name: pd.read_parquet(Path(directorio) / f"{campo.name}.parquet")
+        for campo in fields(Deteccion)
+    })
+
+
+def cargar_anomalias(ruta=DATA, cache_dir=CACHE_DIR):
+    """Detección de la versión vigente de los datos; se recalcula solo si cambió."""
+    cubo = cargar_cubo(ruta, cache_dir)
+    manifiesto = leer_manifiesto(cache_dir)
+    if not manifiesto or "cubo" not in manifiesto:
+        return detectar(cubo)
+
+    directorio = Path(cache_dir) / "cubo" / manifiesto["cubo"]
+    try:
+        return leer(directorio)
+    except OSError:
+        pass
+
+    deteccion = detectar(cubo)
+    try:
+        guardar(deteccion, directorio)
+    except OSError:
+        pass
+    return deteccion
+
+
+def en_periodo(tabla, desde, hasta, playa=None):
+    """Filas de ``anomalias`` entre dos fechas (inclusive), opcionalmente de una playa."""
+    filtro = tabla["fecha"].between(desde, hasta)
+    if playa is not None:
+        filtro &= tabla["nombre_playa"] == playa
+    return tabla[filtro]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lista picos, caídas y huecos de cada playa.")
+    parser.add_argument("--top", type=int, default=20, help="anomalías y huecos a mostrar (default: 20)")
+    parser.add_argument("--datos", type=Path, default=DATA,
+                        help="CSV base de ocupación, o directorio / glob de CSV particionados")
+    args = parser.parse_args(argv)
+
+    deteccion = cargar_anomalias(args.datos)
+    print(f"{len(deteccion.anomalias)} anomalías, {len(deteccion.huecos)} huecos\n")
+    print(deteccion.anomalias.head(args.top).to_string(index=False))
+    if len(deteccion.huecos):
+        print()
+        print(deteccion.huecos.head(args.top).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""Servicio HTTP/JSON local con las vistas del dashboard para otras herramientas.
+
+Responde desde el cubo de agregados (``playas.almacen.cargar_cubo``) con las
+mismas funciones de :mod:`playas.motor`, sin pasar por Streamlit::
+
+    python -m playas.api --puerto 8600
+
+    GET  /v1/temporal/diario?año=2023&mes=5
+    GET  /v1/playas/ranking?año=2023
+    GET  /v1/playas/mapa_calor?año=2023
+    GET  /v1/semana?año=2023&mes=5
+    POST /v1/lote   {"consultas": [{"vista": "semana", "año": 2023}, ...]}
+
+El parámetro ``año`` también se acepta como ``anio``.
+
+Cada respuesta se calcula una vez por versión de los datos y se guarda ya
+serializada, con un ``ETag`` derivado de su contenido: un cliente que repite
+la consulta con ``If-None-Match`` recibe ``304`` sin cuerpo. El servicio
+revisa cada segundo la versión del almacén y, si cambió (CSV nuevo o lote
+anexado), recarga el cubo y descarta las respuestas guardadas.
+
+Usa Tornado, que ya es dependencia de Streamlit.
+"""
+import argparse
+import hashlib
+import json
+import math
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import tornado.ioloop
+import tornado.web
+
+from playas import motor
+from playas.almacen import cargar_cubo, version_datos
+from playas.constantes import CACHE_DIR, DATA, MESES
+
+MAX_RESPUESTAS = 4096
+MAX_CONSULTAS_LOTE = 200
+# Cada cuánto (ms) se revisa si cambió la versión de los datos
+INTERVALO_REVISION = 1000
+
+
+# Nombres de parámetro aceptados; 'anio' para clientes que prefieren ASCII
+_PARAMETROS = {"año": "año", "anio": "año", "mes": "mes"}
+
+
+def _parametros(crudos):
+    """Normaliza los nombres de parámetro y descarta los desconocidos."""
+    return {_PARAMETROS[nombre]: str(valor) for nombre, valor in crudos.items()
+            if nombre in _PARAMETROS and valor is not None}
+
+
+def _entero(parametros, nombre):
+    valor = parametros.get(nombre)
+    if valor is None or valor == "":
+        return None
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{nombre}' debe ser un entero: {valor!r}") from None
+
+
+def _registros(tabla):
+    # to_json convierte NaN en null y los tipos de numpy a JSON nativo
+    if "fecha" in tabla.columns:
+        tabla = tabla.assign(fecha=tabla["fecha"].dt.strftime("%Y-%m-%d"))
+    return json.loads(tabla.to_json(orient="records", force_ascii=False))
+
+
+def _ranking(cubo, año, mes):
+    if año is None:
+        tabla = motor.anual_por_playa(cubo)
+    elif mes is None:
+        tabla = motor.mensual_por_playa(cubo, año)
+    else:
+        tabla = motor.diario_por_playa(cubo, año, mes)
+    return _registros(motor.ranking_playas(tabla).reset_index())
+
+
+def _mapa_calor(cubo, año, mes):
+    pivote = motor.mapa_calor(cubo, año, MESES)
+    return {"playas": pivote.index.tolist(), "meses": pivote.columns.tolist(),
+            "valores": pivote.to_numpy().tolist()}
+
+
+def _semana(cubo, año, mes):
+    estadisticas = motor.estadisticas_semana(cubo, año, mes)
+    insights = motor.insights_semana(estadisticas)
+    insights["variabilidad"] = {dia: None if math.isnan(valor) else valor
+                                for dia, valor in insights["variabilidad"].items()}
+    return {"estadisticas": _registros(estadisticas.rename_axis("dia_semana").reset_index()),
+            "insights": insights}
+
+
+# vista -> (función (cubo, año, mes) -> datos serializables, parámetros obligatorios)
+VISTAS = {
+    "temporal/diario": (lambda cubo, año, mes: _registros(motor.serie_diaria(cubo, año, mes)),
+                        ("año", "mes")),
+    "temporal/mensual": (lambda cubo, año, mes: _registros(motor.serie_mensual(cubo, año)),
+                         ("año",)),
+    "temporal/anual": (lambda cubo, año, mes: _registros(motor.serie_anual(cubo)), ()),
+    "playas/diario": (lambda cubo, año, mes: _registros(motor.diario_por_playa(cubo, año, mes)),
+                      ("año", "mes")),
+    "playas/mensual": (lambda cubo, año, mes: _registros(motor.mensual_por_playa(cubo, año)),
+                       ("año",)),
+    "playas/anual": (lambda cubo, año, mes: _registros(motor.anual_por_playa(cubo)), ()),
+    "playas/ranking": (_ranking, ()),
+    "playas/mapa_calor": (_mapa_calor, ("año",)),
+    "semana": (_semana, ()),
+}
+
+
+def consultar(cubo, vista, parametros):
+    """Datos de ``vista`` con ``parametros`` (``año``, ``mes``) listos para JSON.
+
+    Lanza ``KeyError`` si la vista no existe y ``ValueError`` si los
+    parámetros no son válidos.
+    """
+    funcion, requeridos = VISTAS[vista]
+    valores = {"año": _entero(parametros, "año"), "mes": _entero(parametros, "mes")}
+    for nombre in requeridos:
+        if valores[nombre] is None:
+            raise ValueError(f"'{nombre}' es obligatorio en {vista}")
+    if valores["mes"] is not None and not 1 <= valores["mes"] <= 12:
+        raise ValueError(f"'mes' debe estar entre 1 y 12: {valores['mes']}")
+    return funcion(cubo, valores["año"], valores["mes"])
+
+
+class Servicio:
+    """Cubo vigente y respuestas ya serializadas, compartidos por todas las peticiones."""
+
+    def __init__(self, ruta=DATA, cache_dir=CACHE_DIR, max_respuestas=MAX_RESPUESTAS):
+        self.ruta = ruta
+        self.cache_dir = cache_dir
+        self.max_respuestas = max_respuestas
+        self.version = None
+        self.cubo = None
+        self._respuestas = OrderedDict()  # (vista, parámetros) -> (etag, cuerpo)
+        self._lock = threading.Lock()
+        self._recarga = threading.Lock()
+
+    def actualizar(self):
+        """Recarga el cubo si cambió la versión de los datos; ``True`` si recargó."""
+        # Si ya hay una recarga en curso, esta revisión se omite
+        if not self._recarga.acquire(blocking=False):
+            return False
+        try:
+            version = version_datos(self.ruta, self.cache_dir)
+            if self.cubo is not None and version == self.version:
+                return False
+            cubo = cargar_cubo(self.ruta, self.cache_dir)
+            with self._lock:
+                self.cubo, self.version = cubo, version
+                self._respuestas.clear()
+            return True
+        finally:
+            self._recarga.release()
+
+    def guardada(self, vista, parametros):
+        """La respuesta ya calculada, o ``None``."""
+        llave = (vista, tuple(sorted(parametros.items())))
+        with self._lock:
+            if llave in self._respuestas:
+                self._respuestas.move_to_end(llave)
+                return self._respuestas[llave]
+        return None
+
+    def respuesta(self, vista, parametros):
+        """``(etag, cuerpo)`` de una vista; el cuerpo es JSON en bytes."""
+        guardada = self.guardada(vista, parametros)
+        if guardada is not None:
+            return guardada
+
+        with self._lock:
+            cubo, version = self.cubo, self.version
+        datos = consultar(cubo, vista, parametros)
+        # allow_nan=False: NaN no es JSON válido; las vistas entregan null
+        cuerpo = json.dumps(datos, ensure_ascii=False, allow_nan=False,
+                            default=motor._nativo).encode("utf-8")
+        etag = f'"{hashlib.blake2b(cuerpo, digest_size=12).hexdigest()}"'
+
+        llave = (vista, tuple(sorted(parametros.items())))
+        with self._lock:
+            # Si los datos cambiaron mientras se calculaba, no se guarda
+            if self.version == version:
+                self._respuestas[llave] = (etag, cuerpo)
+                while len(self._respuestas) > self.max_respuestas:
+                    self._respuestas.popitem(last=False)
+        return etag, cuerpo
+
+    def precalcular(self):
+        """Calcula de antemano las vistas de todos los años y meses."""
+        cubo = self.cubo
+        consultas = [("temporal/anual", {}), ("playas/anual", {}), ("playas/ranking", {}),
+                     ("semana", {})]
+        for año in cubo.años:
+            por_año = {"año": str(año)}
+            consultas += [(vista, por_año) for vista in
+                          ("temporal/mensual", "playas/mensual", "playas/ranking",
+                           "playas/mapa_calor", "semana")]
+            for mes in cubo.meses(año):
+                por_mes = {"año": str(año), "mes": str(mes)}
+                consultas += [(vista, por_mes) for vista in
+                              ("temporal/diario", "playas/diario", "playas/ranking", "semana")]
+        for vista, parametros in consultas:
+            self.respuesta(vista, parametros)
+        return len(consultas)
+
+
+class _Base(tornado.web.RequestHandler):
+    def initialize(self, servicio):
+        self.servicio = servicio
+
+    def escribir_json(self, cuerpo, estado=200):
+        self.set_status(estado)
+        self.set_header("Content-Type", "application/json; charset=utf-8")
+        self.finish(cuerpo)
+
+    def error(self, estado, mensaje):
+        self.escribir_json(json.dumps({"error": mensaje}, ensure_ascii=False).encode("utf-8"), estado)
+
+
+class ManejadorVista(_Base):
+    async def get(self, vista):
+        # Tornado decodifica los nombres de los argumentos como latin-1
+        parametros = _parametros({nombre.encode("latin-1").decode("utf-8", "replace"):
+                                  self.get_argument(nombre)
+                                  for nombre in self.request.query_arguments})
+        respuesta = self.servicio.guardada(vista, parametros)
+        if respuesta is None:
+            try:
+                # Calcular no bloquea el loop: las respuestas guardadas siguen saliendo
+                respuesta = await tornado.ioloop.IOLoop.current().run_in_executor(
+                    None, self.servicio.respuesta, vista, parametros)
+            except KeyError:
+                return self.error(404, f"Vista desconocida: {vista}")
+            except ValueError as e:
+                return self.error(400, str(e))
+
+        etag, cuerpo = respuesta
+        self.set_header("ETag", etag)
+        self.set_header("Cache-Control", "no-cache")
+        if self.check_etag_header():
+            self.set_status(304)
+            return self.finish()
+        self.escribir_json(cuerpo)
+
+
+class ManejadorLote(_Base):
+    async def post(self):
+        try:
+            consultas = json.loads(self.request.body)["consultas"]
+            if not isinstance(consultas, list):
+                raise TypeError
+        except (ValueError, KeyError, TypeError):
+            return self.error(400, 'Se esperaba {"consultas": [{"vista": ..., "año": ..., "mes": ...}]}')
+        if len(consultas) > MAX_CONSULTAS_LOTE:
+            return self.error(400, f"A lo más {MAX_CONSULTAS_LOTE} consultas por lote")
+
+        resultados = await tornado.ioloop.IOLoop.current().run_in_executor(None, self._resolver, consultas)
+        self.escribir_json(b'{"resultados":[' + b",".join(resultados) + b"]}")
+
+    def _resolver(self, consultas):
+        # Los cuerpos guardados se insertan tal cual, sin volver a serializar
+        resultados = []
+        for consulta in consultas:
+            consulta = consulta if isinstance(consulta, dict) else {}
+            vista = str(consulta.get("vista"))
+            parametros = _parametros(consulta)
+            cabecera = json.dumps({"vista": vista, **parametros}, ensure_ascii=False)
+            try:
+                _, cuerpo = self.servicio.respuesta(vista, parametros)
+                resultados.append(b'{"consulta":%s,"estado":200,"datos":%s}'
+                                  % (cabecera.encode("utf-8"), cuerpo))
+            except (KeyError, ValueError) as e:
+                estado, mensaje = (404, f"Vista desconocida: {vista}") if isinstance(e, KeyError) else (400, str(e))
+                resultados.append(json.dumps({"consulta": json.loads(cabecera), "estado": estado,
+                                              "error": mensaje}, ensure_ascii=False).encode("utf-8"))
+        return resultados
+
+
+class ManejadorSalud(_Base):
+    def get(self):
+        self.escribir_json(json.dumps({
+            "version": self.servicio.version,
+            "vistas": sorted(VISTAS),
+            "años": self.servicio.cubo.años,
+        }).encode("utf-8"))
+
+
+def crear_aplicacion(servicio):
+    argumentos = {"servicio": servicio}
+    return tornado.web.Application([
+        (r"/salud", ManejadorSalud, argumentos),
+        (r"/v1/lote", ManejadorLote, argumentos),
+        (r"/v1/(.+)", ManejadorVista, argumentos),
+    ])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sirve las vistas del dashboard como JSON por HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8600)
+    parser.add_argument("--datos", type=Path, default=DATA,
+                        help="CSV base de ocupación, o directorio / glob de CSV particionados")
+    parser.add_argument("--sin-precalcular", action="store_true",
+                        help="calcular cada vista hasta que se pida por primera vez")
+    args = parser.parse_args(argv)
+
+    servicio = Servicio(args.datos)
+    servicio.actualizar()
+    if not args.sin_precalcular:
+        print(f"{servicio.precalcular()} respuestas precalculadas")
+
+    def revisar():
+        if servicio.actualizar() and not args.sin_precalcular:
+            servicio.precalcular()
+
+    loop = tornado.ioloop.IOLoop.current()
+    crear_aplicacion(servicio).listen(args.puerto, args.host)
+    # La revisión corre en un hilo aparte para no detener las respuestas
+    tornado.ioloop.PeriodicCallback(lambda: loop.run_in_executor(None, revisar),
+                                    INTERVALO_REVISION).start()
+    print(f"Escuchando en http://{args.host}:{args.puerto}/")
+    loop.start()
+
+
+if __name__ == "__main__":
+    main()
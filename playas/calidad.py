@@ -0,0 +1,188 @@
+"""Validación de calidad de las filas al ingerirlas, con reporte y cuarentena.
+
+Corre sobre cada bloque ya con fechas parseadas y antes de tipar la
+ocupación, así que lo que se aparta aquí nunca llega a la caché Parquet ni
+al cubo de agregados. Todas las revisiones son vectorizadas sobre el bloque:
+
+- Nombres de playa: se corrigen variantes de codificación del mismo nombre
+  (espacios sobrantes, "Ã±" por "ñ", tilde compuesta o combinada). Se
+  trabaja sobre las categorías, no sobre las filas. Los nombres que solo
+  difieren en acentos o mayúsculas no se unen, pero se reportan.
+- Cuarentena: filas sin playa, sin ocupación, con ocupación no numérica
+  (texto como ``abc`` o ``1,200``), con decimales, negativa o mayor a
+  ``OCUPACION_MAXIMA``. Cada fila se aparta por el primer motivo que
+  cumple.
+
+Varias filas de la misma playa el mismo día se conservan todas y se suman,
+como varios conteos del día, tengan o no la misma ocupación; solo se
+reportan. Esto y los días faltantes se calculan aparte sobre los datos
+completos (:func:`duplicados`, :func:`dias_faltantes`), porque un bloque, un
+lote o una partición no ve las filas de los demás.
+"""
+import unicodedata
+from dataclasses import asdict, dataclass, field
+
+import numpy as np
+import pandas as pd
+
+# Más personas que esto en una playa en un día es un error de captura
+OCUPACION_MAXIMA = 50_000
+
+MOTIVOS = {
+    "sin_playa": "sin nombre de playa",
+    "sin_ocupacion": "sin ocupación",
+    "no_numerica": "ocupación no numérica",
+    "no_entera": "ocupación con decimales",
+    "negativa": "ocupación negativa",
+    "implausible": f"ocupación mayor a {OCUPACION_MAXIMA:,}",
+}
+
+_MAX_EJEMPLOS = 5
+
+
+@dataclass
+class ReporteCalidad:
+    filas: int = 0
+    # Filas apartadas por motivo (llaves de MOTIVOS)
+    cuarentena: dict = field(default_factory=dict)
+    # Variante -> nombre corregido, y filas que se corrigieron
+    nombres: dict = field(default_factory=dict)
+    corregidas: int = 0
+    # Grupos de nombres que solo difieren en acentos o mayúsculas
+    similares: list = field(default_factory=list)
+    # Motivo -> algunas filas de ejemplo (como texto)
+    ejemplos: dict = field(default_factory=dict)
+
+    @property
+    def apartadas(self):
+        return sum(self.cuarentena.values())
+
+    def combinar(self, otro):
+        cuarentena = dict(self.cuarentena)
+        for motivo, n in otro.cuarentena.items():
+            cuarentena[motivo] = cuarentena.get(motivo, 0) + n
+        ejemplos = {motivo: list(filas) for motivo, filas in self.ejemplos.items()}
+        for motivo, filas in otro.ejemplos.items():
+            ejemplos[motivo] = (ejemplos.get(motivo, []) + filas)[:_MAX_EJEMPLOS]
+        similares = self.similares + [grupo for grupo in otro.similares
+                                      if grupo not in self.similares]
+        return ReporteCalidad(
+            filas=self.filas + otro.filas,
+            cuarentena=cuarentena,
+            nombres={**self.nombres, **otro.nombres},
+            corregidas=self.corregidas + otro.corregidas,
+            similares=similares,
+            ejemplos=ejemplos,
+        )
+
+    def como_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def desde_dict(cls, datos):
+        return cls(**datos) if datos else cls()
+
+
+def corregir_nombre(nombre):
+    """Forma canónica de un nombre: sin espacios sobrantes, UTF-8 reparado y NFC."""
+    try:
+        # "Del NiÃ±o": UTF-8 leído como Latin-1
+        nombre = nombre.encode("latin-1").decode("utf-8")
+    except UnicodeError:
+        pass
+    return unicodedata.normalize("NFC", " ".join(nombre.split()))
+
+
+def _llave_similar(nombre):
+    sin_acentos = unicodedata.normalize("NFKD", nombre).encode("ascii", "ignore").decode()
+    return sin_acentos.casefold()
+
+
+def _nombres(serie):
+    """Une las categorías que son variantes de codificación del mismo nombre."""
+    serie = serie.astype("category")
+    categorias = serie.cat.categories.astype(str)
+    corregidas = pd.Index([corregir_nombre(nombre) for nombre in categorias])
+    cambios = {original: nueva for original, nueva in zip(categorias, corregidas) if original != nueva}
+
+    nuevas, posicion = np.unique(corregidas, return_inverse=True)
+    codigos = serie.cat.codes.to_numpy()
+    # El código -1 (sin playa) toma el último elemento: sigue siendo -1
+    nuevos_codigos = np.append(posicion, -1)[codigos]
+    filas = int(np.isin(codigos, np.flatnonzero(corregidas != categorias)).sum())
+
+    llaves = pd.Series([_llave_similar(nombre) for nombre in nuevas])
+    similares = [sorted(nuevas[grupo].tolist()) for grupo in llaves.groupby(llaves).indices.values()
+                 if len(grupo) > 1]
+    return pd.Categorical.from_codes(nuevos_codigos, nuevas), cambios, filas, similares
+
+
+def validar(df):
+    """Corrige nombres y aparta las filas inválidas de ``df``.
+
+    ``df`` trae ``fecha`` ya parseada y ``ocupacion`` tal como venga en el
+    CSV (números o texto). Devuelve las filas válidas (en el mismo orden, con
+    ``ocupacion`` numérica) y un :class:`ReporteCalidad`.
+    """
+    nombres, cambios, corregidas, similares = _nombres(df["nombre_playa"])
+    df = df.assign(nombre_playa=nombres)
+    ocupacion = pd.to_numeric(df["ocupacion"], errors="coerce")
+    vacia = df["ocupacion"].isna()
+
+    condiciones = {
+        "sin_playa": df["nombre_playa"].isna(),
+        "sin_ocupacion": vacia,
+        "no_numerica": ocupacion.isna() & ~vacia,
+        "negativa": ocupacion < 0,
+        "implausible": ocupacion > OCUPACION_MAXIMA,
+        "no_entera": ocupacion % 1 != 0,
+    }
+    # Cada fila cuenta una sola vez, con el primer motivo que cumple
+    motivos = {}
+    invalida = np.zeros(len(df), dtype=bool)
+    for motivo, condicion in condiciones.items():
+        motivos[motivo] = ~invalida & condicion.to_numpy()
+        invalida |= motivos[motivo]
+    validas = df[~invalida].assign(ocupacion=ocupacion[~invalida])
+
+    ejemplos = {}
+    for motivo, filtro in motivos.items():
+        if filtro.any():
+            muestra = df[filtro].head(_MAX_EJEMPLOS)
+            ejemplos[motivo] = (muestra.assign(fecha=muestra["fecha"].dt.strftime("%Y-%m-%d"))
+                                .astype(str).to_dict(orient="records"))
+
+    reporte = ReporteCalidad(
+        filas=len(df),
+        cuarentena={motivo: int(filtro.sum()) for motivo, filtro in motivos.items() if filtro.any()},
+        nombres=cambios,
+        corregidas=corregidas,
+        similares=similares,
+        ejemplos=ejemplos,
+    )
+    return validas.reset_index(drop=True), reporte
+
+
+def duplicados(df):
+    """Filas extra con la misma (fecha, playa) en los datos completos.
+
+    Devuelve ``(mismo_dia, iguales)``: todas las filas extra y, de ellas, las
+    que además repiten la ocupación. Ninguna se aparta: se suman.
+    """
+    mismo_dia = df.duplicated(["fecha", "nombre_playa"])
+    iguales = df.duplicated(["fecha", "nombre_playa", "ocupacion"])
+    return int(mismo_dia.sum()), int(iguales.sum())
+
+
+def dias_faltantes(fechas):
+    """Días sin ningún registro entre la primera y la última fecha.
+
+    ``fechas`` debe venir ordenada (como la columna ``fecha`` de los datos
+    cargados); se recorre una sola vez.
+    """
+    dias = fechas.to_numpy(dtype="datetime64[D]")
+    if not len(dias):
+        return pd.DatetimeIndex([])
+    distintos = dias[np.flatnonzero(np.diff(dias, prepend=dias[0] - 1))]
+    todos = np.arange(distintos[0], distintos[-1] + 1)
+    return pd.DatetimeIndex(np.setdiff1d(todos, distintos, assume_unique=True))
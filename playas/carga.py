@@ -0,0 +1,492 @@
+"""Carga de los datos de ocupación con caché columnar en Parquet.
+
+El CSV solo se vuelve a parsear cuando cambia su contenido. La caché guarda
+las filas ya tipadas (fechas, categorías y enteros compactos) junto con la
+huella del archivo fuente (tamaño, mtime y hash) en los metadatos del Parquet.
+
+El CSV se lee por bloques y cada bloque se escribe como un row group, así que
+convertir una historia más grande que la RAM no necesita tenerla completa en
+memoria; ``iterar_base`` la recorre después de la misma forma.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import ExitStack
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pandas.api.types import union_categoricals
+
+from playas.calidad import ReporteCalidad, validar
+from playas.constantes import CACHE_DIR, COLUMNAS, DATA, DIAS_SEMANA, MESES
+from playas.fechas import ReporteFechas, parsear_fechas
+from playas.instrumentacion import tramo
+from playas.indice import ordenar_por_fecha
+
+# Se incrementa cuando cambia el esquema o la forma de derivar columnas,
+# para invalidar cachés escritas por versiones anteriores.
+VERSION_ESQUEMA = 7
+
+_CLAVE_HUELLA = b"playas.huella"
+_CLAVE_CONTENIDO = b"playas.contenido"
+
+# Filas por bloque al leer en streaming: acota la memoria pico de la carga
+FILAS_POR_BLOQUE = 500_000
+
+
+def version_datos(ruta=DATA):
+    """Versión barata del archivo (tamaño y mtime) para usar como llave de caché.
+
+    Devuelve ``None`` si el archivo no existe; el error se reporta al cargar.
+    """
+    try:
+        return _stat(ruta)
+    except FileNotFoundError:
+        return None
+
+
+def _stat(ruta):
+    info = os.stat(ruta)
+    return info.st_size, info.st_mtime_ns
+
+
+def hash_archivo(ruta, bloque=1 << 20):
+    h = hashlib.blake2b(digest_size=16)
+    with open(ruta, "rb") as f:
+        while datos := f.read(bloque):
+            h.update(datos)
+    return h.hexdigest()
+
+
+def huella_archivo(ruta):
+    tamano, mtime_ns = _stat(ruta)
+    return {
+        "version": VERSION_ESQUEMA,
+        "tamano": tamano,
+        "mtime_ns": mtime_ns,
+        "hash": hash_archivo(ruta),
+    }
+
+
+def validar_esquema(df, ruta):
+    """Comprueba que la fuente tenga las columnas que espera el dashboard.
+
+    Los valores de cada columna se revisan fila por fila en ``playas.calidad``.
+    """
+    faltantes = [c for c in COLUMNAS if c not in df.columns]
+    if faltantes:
+        raise ValueError(f"{Path(ruta).name}: faltan las columnas {', '.join(faltantes)}")
+
+
+def leer_csv_por_bloques(ruta=DATA, filas_por_bloque=FILAS_POR_BLOQUE):
+    """Lee el CSV por bloques y entrega cada uno tipado y con columnas derivadas.
+
+    La memoria pico queda acotada por ``filas_por_bloque`` y no por el tamaño
+    del archivo. Cada bloque viene ordenado por (fecha, nombre_playa), ya sin
+    las filas en cuarentena (ver ``playas.calidad``), y trae sus propios
+    reportes en ``attrs["reporte_fechas"]`` y ``attrs["reporte_calidad"]``.
+    """
+    # Lee 'fecha' como texto para controlar el parseo nosotros
+    with pd.read_csv(ruta, dtype={"fecha": "string", "nombre_playa": "category"},
+                     chunksize=filas_por_bloque) as lector:
+        for bloque in lector:
+            validar_esquema(bloque, ruta)
+            yield _tipar(bloque)
+
+
+def _tipar(df):
+    # Cada cadena distinta se parsea una sola vez; las filas sin fecha válida
+    # se descartan y quedan contadas en el reporte
+    df["fecha"], reporte = parsear_fechas(df["fecha"])
+    # Las filas inválidas se apartan antes de tipar: nunca llegan a la caché
+    df, calidad = validar(df.dropna(subset=["fecha"])[COLUMNAS])
+    df = ordenar_por_fecha(df)
+    df["ocupacion"] = df["ocupacion"].astype("int32")
+
+    df = derivar_columnas(df)
+    df.attrs["reporte_fechas"] = reporte.como_dict()
+    df.attrs["reporte_calidad"] = calidad.como_dict()
+    return df
+
+
+def retipar(df):
+    """Vuelve a tipar y validar filas guardadas con una versión anterior del esquema.
+
+    Para lotes de los que no se guardó el CSV original. Se conserva el
+    reporte de fechas que traían: las fechas ya no tienen su formato de origen.
+    """
+    crudo = pd.DataFrame({
+        "nombre_playa": df["nombre_playa"].astype("category"),
+        "ocupacion": df["ocupacion"],
+        "fecha": df["fecha"].dt.strftime("%Y-%m-%d").astype("string"),
+    })
+    tipado = _tipar(crudo)
+    if "reporte_fechas" in df.attrs:
+        tipado.attrs["reporte_fechas"] = df.attrs["reporte_fechas"]
+    return tipado
+
+
+def leer_csv(ruta=DATA):
+    """Lee un CSV completo en memoria (lotes diarios y archivos pequeños).
+
+    Las filas quedan ordenadas por (fecha, nombre_playa) para poder rebanar
+    periodos con búsqueda binaria (ver ``playas.indice``). El resultado del
+    parseo de fechas queda en ``df.attrs["reporte_fechas"]`` y el de la
+    validación en ``df.attrs["reporte_calidad"]``.
+    """
+    df = concatenar(list(leer_csv_por_bloques(ruta)))
+    return df if df["fecha"].is_monotonic_increasing else ordenar_por_fecha(df)
+
+
+def derivar_columnas(df):
+    """Agrega año, mes, día de la semana y nombre de mes con tipos compactos."""
+    fechas = df["fecha"].dt
+    df["año"] = fechas.year.astype("int16")
+    df["mes"] = fechas.month.astype("int8")
+    # Categorías construidas desde los códigos: sin diccionarios ni cadenas por fila
+    df["dia_semana"] = pd.Categorical.from_codes(
+        fechas.weekday.to_numpy(), categories=DIAS_SEMANA, ordered=True
+    )
+    df["mes_nombre"] = pd.Categorical.from_codes(
+        df["mes"].to_numpy() - 1, categories=MESES, ordered=True
+    )
+    return df
+
+
+def concatenar(frames):
+    """Concatena frames tipados conservando ``nombre_playa`` como categoría.
+
+    ``pd.concat`` degrada a ``object`` cuando las categorías difieren (p. ej. un
+    lote trae una playa nueva), así que primero se unifican. Los reportes de
+    fechas y de calidad de cada frame se suman.
+    """
+    reporte, calidad = ReporteFechas(), ReporteCalidad()
+    for f in frames:
+        reporte = reporte.combinar(ReporteFechas.desde_dict(f.attrs.get("reporte_fechas")))
+        calidad = calidad.combinar(ReporteCalidad.desde_dict(f.attrs.get("reporte_calidad")))
+
+    frames = [f for f in frames if len(f)] or frames[:1]
+    playas = union_categoricals([f["nombre_playa"] for f in frames]).categories
+    df = pd.concat(
+        [f.assign(nombre_playa=f["nombre_playa"].cat.set_categories(playas)) for f in frames],
+        ignore_index=True,
+    )
+    df.attrs["reporte_fechas"] = reporte.como_dict()
+    df.attrs["reporte_calidad"] = calidad.como_dict()
+    return df
+
+
+def _ruta_cache(ruta, cache_dir):
+    return Path(cache_dir) / f"{Path(ruta).stem}.parquet"
+
+
+def _leer_metadatos(ruta_cache):
+    # Metadatos a nivel de archivo: incluyen los que se agregan al cerrar el
+    # escritor, que no aparecen en el esquema Arrow.
+    try:
+        metadatos = pq.read_metadata(ruta_cache).metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return None, None
+    huella, contenido = metadatos.get(_CLAVE_HUELLA), metadatos.get(_CLAVE_CONTENIDO)
+    return (json.loads(huella) if huella else None,
+            json.loads(contenido) if contenido else None)
+
+
+def _tabla_arrow(df, metadatos_extra=None):
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    metadatos = dict(tabla.schema.metadata or {})
+    # Misma llave que usa DataFrame.to_parquet: read_parquet restaura df.attrs
+    if df.attrs:
+        metadatos[b"PANDAS_ATTRS"] = json.dumps(df.attrs).encode()
+    metadatos.update(metadatos_extra or {})
+    return tabla.replace_schema_metadata(metadatos)
+
+
+def escribir_parquet(df, ruta, metadatos_extra=None):
+    """Escribe ``df`` en Parquet de forma atómica (otro proceso nunca lo ve a medias)."""
+    tabla = _tabla_arrow(df, metadatos_extra)
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_suffix(f".{os.getpid()}.tmp")
+    pq.write_table(tabla, temporal)
+    os.replace(temporal, ruta)
+
+
+def escribir_arrow(df, ruta):
+    """Escribe ``df`` como archivo Arrow IPC sin comprimir, de forma atómica.
+
+    A diferencia del Parquet, el formato en disco es el mismo que en memoria:
+    :func:`abrir_arrow` lo mapea sin decodificar ni copiar.
+    """
+    tabla = _tabla_arrow(df)
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_suffix(f".{os.getpid()}.tmp")
+    with pa.OSFile(str(temporal), "wb") as destino:
+        with pa.ipc.new_file(destino, tabla.schema) as escritor:
+            escritor.write_table(tabla)
+    os.replace(temporal, ruta)
+
+
+def escribir_arrow_por_bloques(bloques, ruta):
+    """Como :func:`escribir_arrow`, pero sin juntar los bloques en memoria.
+
+    Cada columna se va anexando a un archivo temporal junto a ``ruta`` (las
+    categóricas como códigos sobre la unión de sus categorías); al final esos
+    archivos se mapean y se escriben como un solo record batch, para que
+    :func:`abrir_arrow` siga sin copiar. Los reportes de fechas y de calidad
+    de los bloques se suman.
+
+    Devuelve ``False`` sin escribir nada si los bloques no vienen ordenados por
+    fecha o alguna columna tiene nulos o no es de ancho fijo; entonces hay que
+    juntar (y ordenar) las filas y usar :func:`escribir_arrow`. Lanza
+    ``ValueError`` si un bloque trae columnas o tipos distintos a los del
+    primero.
+    """
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    reporte, calidad = ReporteFechas(), ReporteCalidad()
+    muestra, categorias, filas, ultima = None, {}, 0, None
+    with (tempfile.TemporaryDirectory(dir=ruta.parent, ignore_cleanup_errors=True) as directorio,
+          ExitStack() as archivos):
+        temporales = {}
+        for bloque in bloques:
+            reporte = reporte.combinar(ReporteFechas.desde_dict(bloque.attrs.get("reporte_fechas")))
+            calidad = calidad.combinar(ReporteCalidad.desde_dict(bloque.attrs.get("reporte_calidad")))
+            if not len(bloque):
+                continue
+            fechas = bloque["fecha"]
+            if not fechas.is_monotonic_increasing or (ultima is not None and fechas.iloc[0] < ultima):
+                return False
+            if bloque.isna().to_numpy().any():
+                return False
+            ultima = fechas.iloc[-1]
+            if muestra is not None:
+                _revisar_bloque(bloque, muestra)
+            else:
+                muestra = bloque.head(0)
+                if any(not isinstance(tipo, pd.CategoricalDtype) and tipo.kind not in "biufM"
+                       for tipo in muestra.dtypes):
+                    return False
+                temporales = {columna: Path(directorio) / str(i) for i, columna in enumerate(muestra)}
+                salidas = {columna: archivos.enter_context(open(temporal, "wb"))
+                           for columna, temporal in temporales.items()}
+                categorias = {columna: muestra[columna].cat.categories for columna in muestra
+                              if isinstance(muestra[columna].dtype, pd.CategoricalDtype)}
+
+            for columna, salida in salidas.items():
+                valores = bloque[columna]
+                if columna in categorias:
+                    nuevas = valores.cat.categories.difference(categorias[columna], sort=False)
+                    categorias[columna] = categorias[columna].append(nuevas)
+                    valores = valores.cat.set_categories(categorias[columna]).cat.codes.astype("int32")
+                salida.write(valores.to_numpy().tobytes())
+            filas += len(bloque)
+        if muestra is None:
+            return False
+        archivos.close()
+
+        muestra = muestra.assign(**{columna: muestra[columna].cat.set_categories(nuevas)
+                                    for columna, nuevas in categorias.items()})
+        muestra.attrs = {"reporte_fechas": reporte.como_dict(), "reporte_calidad": calidad.como_dict()}
+        esquema = _tabla_arrow(muestra).schema
+        columnas = []
+        for columna, campo in zip(muestra, esquema):
+            if columna in categorias:
+                codigos = _codigos(temporales[columna], muestra[columna].cat.codes.dtype)
+                indices = pa.Array.from_buffers(campo.type.index_type, filas, [None, pa.py_buffer(codigos)])
+                columnas.append(pa.DictionaryArray.from_arrays(
+                    indices, pa.array(categorias[columna], type=campo.type.value_type),
+                    ordered=campo.type.ordered))
+            else:
+                valores = np.memmap(temporales[columna], dtype=muestra[columna].dtype, mode="r")
+                columnas.append(pa.Array.from_buffers(campo.type, filas, [None, pa.py_buffer(valores)]))
+
+        temporal = ruta.with_suffix(f".{os.getpid()}.tmp")
+        with pa.OSFile(str(temporal), "wb") as destino:
+            with pa.ipc.new_file(destino, esquema) as escritor:
+                escritor.write_table(pa.Table.from_arrays(columnas, schema=esquema))
+    os.replace(temporal, ruta)
+    return True
+
+
+def _revisar_bloque(bloque, muestra):
+    # Los búferes de cada bloque se copian tal cual: todos deben traer los
+    # tipos del primero. Solo las categóricas sin orden (las playas) pueden
+    # sumar categorías; las ordenadas deben traer las mismas.
+    if list(bloque.columns) != list(muestra.columns):
+        raise ValueError(f"El bloque trae las columnas {list(bloque.columns)}; "
+                         f"se esperaban {list(muestra.columns)}")
+    for columna in muestra:
+        esperado, tipo = muestra[columna].dtype, bloque[columna].dtype
+        if isinstance(esperado, pd.CategoricalDtype):
+            valido = (isinstance(tipo, pd.CategoricalDtype) and tipo.ordered == esperado.ordered
+                      and (not esperado.ordered or tipo.categories.equals(esperado.categories)))
+        else:
+            valido = tipo == esperado
+        if not valido:
+            raise ValueError(f"El bloque trae '{columna}' como {tipo} con otras categorías "
+                             f"o de otro tipo que el primero ({esperado})")
+
+
+def _codigos(temporal, tipo):
+    # Los códigos se anexaron como int32; se bajan al tipo que usaría pandas
+    # para ese número de categorías, por bloques y también en disco
+    codigos = np.memmap(temporal, dtype="int32", mode="r")
+    if tipo == codigos.dtype:
+        return codigos
+    convertido = temporal.with_suffix(".codigos")
+    with open(convertido, "wb") as salida:
+        for inicio in range(0, len(codigos), FILAS_POR_BLOQUE):
+            salida.write(codigos[inicio:inicio + FILAS_POR_BLOQUE].astype(tipo).tobytes())
+    return np.memmap(convertido, dtype=tipo, mode="r")
+
+
+def abrir_arrow(ruta):
+    """DataFrame de solo lectura sobre el archivo Arrow ``ruta`` mapeado en memoria.
+
+    Las columnas (y los códigos de las categóricas) apuntan directo a las
+    páginas del archivo, así que todos los que lo abren comparten la misma
+    copia en la caché de páginas del sistema operativo. Escribir en ellas
+    lanza ``ValueError``.
+    """
+    tabla = pa.ipc.open_file(pa.memory_map(str(ruta))).read_all()
+    df = tabla.to_pandas(split_blocks=True)
+    attrs = (tabla.schema.metadata or {}).get(b"PANDAS_ATTRS")
+    if attrs:
+        df.attrs = json.loads(attrs)
+    return df
+
+
+def _escribir_por_bloques(bloques, ruta_cache, metadatos):
+    """Escribe los bloques como row groups de un solo Parquet, de forma atómica.
+
+    ``metadatos`` se llama al terminar y devuelve los metadatos de archivo; así
+    pueden depender de lo que se leyó en los bloques.
+    """
+    ruta_cache.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta_cache.with_suffix(f".{os.getpid()}.tmp")
+    escritor = esquema = None
+    try:
+        for bloque in bloques:
+            tabla = bloque if isinstance(bloque, pa.Table) else pa.Table.from_pandas(bloque, preserve_index=False)
+            if escritor is None:
+                esquema = tabla.schema
+                escritor = pq.ParquetWriter(temporal, esquema)
+            # Las categorías de cada bloque pueden diferir; el esquema no
+            escritor.write_table(tabla.cast(esquema))
+        escritor.add_key_value_metadata(metadatos())
+        escritor.close()
+        os.replace(temporal, ruta_cache)
+    except BaseException:
+        if escritor is not None:
+            escritor.close()
+        temporal.unlink(missing_ok=True)
+        raise
+
+
+def _reconstruir_cache(ruta, ruta_cache, huella, filas_por_bloque):
+    # Lo que se sabe del contenido se acumula mientras pasan los bloques
+    estado = {"ordenado": True, "ultima": None, "reporte": ReporteFechas(),
+              "calidad": ReporteCalidad()}
+
+    def bloques():
+        for bloque in leer_csv_por_bloques(ruta, filas_por_bloque):
+            reporte = ReporteFechas.desde_dict(bloque.attrs["reporte_fechas"])
+            estado["reporte"] = estado["reporte"].combinar(reporte)
+            calidad = ReporteCalidad.desde_dict(bloque.attrs["reporte_calidad"])
+            estado["calidad"] = estado["calidad"].combinar(calidad)
+            if len(bloque):
+                if estado["ultima"] is not None and bloque["fecha"].iloc[0] < estado["ultima"]:
+                    estado["ordenado"] = False
+                estado["ultima"] = bloque["fecha"].iloc[-1]
+            yield bloque
+
+    def metadatos():
+        contenido = {"ordenado": estado["ordenado"],
+                     "reporte_fechas": estado["reporte"].como_dict(),
+                     "reporte_calidad": estado["calidad"].como_dict()}
+        return {_CLAVE_HUELLA: json.dumps(huella), _CLAVE_CONTENIDO: json.dumps(contenido)}
+
+    _escribir_por_bloques(bloques(), ruta_cache, metadatos)
+
+
+def _renovar_huella(ruta_cache, huella, contenido):
+    # El contenido no cambió: se copian los row groups tal cual, sin reparsear
+    archivo = pq.ParquetFile(ruta_cache)
+    _escribir_por_bloques(
+        (archivo.read_row_group(i) for i in range(archivo.num_row_groups)),
+        ruta_cache,
+        lambda: {_CLAVE_HUELLA: json.dumps(huella), _CLAVE_CONTENIDO: json.dumps(contenido)},
+    )
+
+
+def asegurar_cache(ruta=DATA, cache_dir=CACHE_DIR, filas_por_bloque=FILAS_POR_BLOQUE):
+    """Deja vigente la caché Parquet del CSV y devuelve su ruta.
+
+    La caché se considera válida si coincide el tamaño y el mtime del CSV. Si
+    solo cambió el mtime (p. ej. tras un ``touch`` o una copia) se compara el
+    hash del contenido antes de decidir reparsear. Devuelve ``None`` si no se
+    puede escribir (disco de solo lectura).
+    """
+    ruta = Path(ruta)
+    ruta_cache = _ruta_cache(ruta, cache_dir)
+    guardada, contenido = _leer_metadatos(ruta_cache)
+    tamano, mtime_ns = _stat(ruta)
+
+    if (guardada and contenido and guardada.get("version") == VERSION_ESQUEMA
+            and guardada["tamano"] == tamano):
+        if guardada["mtime_ns"] == mtime_ns:
+            return ruta_cache
+
+        huella = huella_archivo(ruta)
+        if huella["hash"] == guardada["hash"]:
+            try:
+                _renovar_huella(ruta_cache, huella, contenido)
+            except OSError:
+                pass
+            return ruta_cache
+    else:
+        huella = huella_archivo(ruta)
+
+    try:
+        with tramo("csv"):
+            _reconstruir_cache(ruta, ruta_cache, huella, filas_por_bloque)
+    except OSError:
+        return None
+    return ruta_cache
+
+
+def cargar_base(ruta=DATA, cache_dir=CACHE_DIR):
+    """Devuelve los datos tipados del CSV, usando la caché Parquet si sigue vigente."""
+    ruta_cache = asegurar_cache(ruta, cache_dir)
+    if ruta_cache is None:
+        return leer_csv(ruta)
+
+    df = pd.read_parquet(ruta_cache)
+    _, contenido = _leer_metadatos(ruta_cache)
+    df.attrs["reporte_fechas"] = contenido["reporte_fechas"]
+    df.attrs["reporte_calidad"] = contenido["reporte_calidad"]
+    return df if contenido["ordenado"] else ordenar_por_fecha(df)
+
+
+def iterar_base(ruta=DATA, cache_dir=CACHE_DIR, filas_por_bloque=FILAS_POR_BLOQUE):
+    """Recorre los datos tipados del CSV por bloques, sin cargarlos completos."""
+    ruta_cache = asegurar_cache(ruta, cache_dir, filas_por_bloque)
+    if ruta_cache is None:
+        yield from leer_csv_por_bloques(ruta, filas_por_bloque)
+        return
+
+    # Los reportes son del archivo completo: van solo en el primer bloque, así
+    # que sumar los de todos los bloques da el total
+    _, contenido = _leer_metadatos(ruta_cache)
+    for i, lote in enumerate(pq.ParquetFile(ruta_cache).iter_batches(batch_size=filas_por_bloque)):
+        bloque = lote.to_pandas()
+        if i == 0:
+            bloque.attrs["reporte_fechas"] = contenido["reporte_fechas"]
+            bloque.attrs["reporte_calidad"] = contenido["reporte_calidad"]
+        yield bloque
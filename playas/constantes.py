@@ -0,0 +1,20 @@
+import os
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+# Un CSV o una fuente particionada (directorio o patrón glob de CSV);
+# PLAYAS_DATOS permite apuntar el dashboard a otra fuente
+DATA = Path(os.environ.get("PLAYAS_DATOS", ROOT / "datos" / "ocupacion_playas_cancun.csv"))
+
+# Directorio para cachés derivadas de los datos (no se versiona)
+CACHE_DIR = ROOT / "datos" / ".cache"
+
+# Columnas mínimas que debe traer cualquier fuente de datos
+COLUMNAS = ["nombre_playa", "ocupacion", "fecha"]
+
+DIAS_SEMANA = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+
+MESES = [
+    "Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio",
+    "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"
+]
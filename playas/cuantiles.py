@@ -0,0 +1,74 @@
+"""Resumen de cuantiles combinable (al estilo t-digest) para medianas por celda.
+
+Cada celda del cubo, p. ej. (año, mes, dia_semana), guarda su distribución
+como centroides ``(valor, peso)``. Mientras la celda tenga a lo más
+``CENTROIDES`` valores distintos, los centroides son los valores exactos con
+su frecuencia y la mediana es exacta. Al rebasar ese tope se comprimen con la
+función de escala k1 del t-digest, que deja centroides más finos en las colas
+y más gruesos en el centro; el error de rango queda acotado por
+~1/``CENTROIDES``.
+
+Combinar celdas (otro filtro, un lote nuevo) es concatenar sus centroides y
+volver a comprimir: el tamaño no depende del número de filas.
+"""
+import numpy as np
+import pandas as pd
+
+CENTROIDES = 200
+
+
+def desde_valores(tabla, llaves, columna="ocupacion", centroides=CENTROIDES):
+    """Centroides por celda ``llaves`` a partir de filas crudas."""
+    exactos = (tabla.groupby([*llaves, columna], observed=True).size()
+               .rename("peso").reset_index().rename(columns={columna: "valor"}))
+    exactos["valor"] = exactos["valor"].astype("float64")
+    return comprimir(exactos, llaves, centroides)
+
+
+def combinar(tabla, llaves, centroides=CENTROIDES):
+    """Combina los centroides de varias piezas con las mismas llaves."""
+    sumados = tabla.groupby([*llaves, "valor"], observed=True, as_index=False)["peso"].sum()
+    return comprimir(sumados, llaves, centroides)
+
+
+def comprimir(tabla, llaves, centroides=CENTROIDES):
+    """Reduce a lo más ``centroides`` los centroides de cada celda que los rebase.
+
+    ``tabla`` debe venir ordenada por ``llaves`` y ``valor``.
+    """
+    distintos = tabla.groupby(llaves, observed=True, sort=False)["valor"].transform("size")
+    grandes = (distintos > centroides).to_numpy()
+    if not grandes.any():
+        return tabla
+
+    sub = tabla[grandes]
+    peso = sub["peso"].groupby([sub[llave] for llave in llaves], observed=True, sort=False)
+    # Rango medio (0..1) de cada centroide dentro de su celda
+    q = (peso.cumsum() - sub["peso"] / 2) / peso.transform("sum")
+    k = np.floor(centroides * (np.arcsin(2 * q - 1) / np.pi + 0.5)).clip(upper=centroides - 1)
+    comprimidos = (sub.assign(_k=k.to_numpy(), _vp=sub["valor"] * sub["peso"])
+                   .groupby([*llaves, "_k"], observed=True, as_index=False)
+                   .agg(peso=("peso", "sum"), _vp=("_vp", "sum")))
+    comprimidos["valor"] = comprimidos["_vp"] / comprimidos["peso"]
+
+    return (pd.concat([tabla[~grandes], comprimidos[list(tabla.columns)]], ignore_index=True)
+            .sort_values([*llaves, "valor"], ignore_index=True))
+
+
+def mediana(tabla, por):
+    """Mediana de cada grupo ``por`` combinando los centroides de todas sus celdas.
+
+    Con centroides exactos coincide con ``Series.median``: el promedio de los
+    dos valores centrales cuando el total es par.
+    """
+    pesos = tabla.groupby([por, "valor"], observed=True)["peso"].sum().reset_index()
+    medianas = {}
+    for grupo, filas in pesos.groupby(por, observed=True):
+        valores = filas["valor"].to_numpy()
+        acumulado = filas["peso"].to_numpy().cumsum()
+        total = acumulado[-1]
+        # Posiciones (base 0) de los dos elementos centrales
+        bajo = valores[np.searchsorted(acumulado, (total - 1) // 2, side="right")]
+        alto = valores[np.searchsorted(acumulado, total // 2, side="right")]
+        medianas[grupo] = (bajo + alto) / 2
+    return pd.Series(medianas, dtype="float64")
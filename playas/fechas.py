@@ -0,0 +1,94 @@
+"""Normalización de fechas con detección de formato y reporte de parseo.
+
+Cada fecha aparece una vez por playa, así que hay pocas cadenas distintas
+para muchas filas. El parseo trabaja sobre las cadenas únicas
+(``pd.factorize``): se limpian, se detecta su formato por forma y cada una se
+convierte una sola vez; el resultado se expande a las filas con los códigos.
+El costo crece con el número de fechas distintas, no con el de filas.
+"""
+from dataclasses import asdict, dataclass, field
+
+import numpy as np
+import pandas as pd
+
+# Formatos aceptados y la forma (ya normalizada a '/') que los identifica.
+# El orden importa: el primero que coincide gana.
+FORMATOS = {
+    "%d/%m/%Y": r"\d{1,2}/\d{1,2}/\d{4}",
+    "%d/%m/%y": r"\d{1,2}/\d{1,2}/\d{2}",
+    "%Y/%m/%d": r"\d{4}/\d{1,2}/\d{1,2}",
+}
+
+_MAX_EJEMPLOS = 5
+
+
+@dataclass
+class ReporteFechas:
+    filas: int = 0
+    unicas: int = 0
+    # Filas parseadas con cada formato
+    formatos: dict = field(default_factory=dict)
+    # Filas cuya cadena hubo que limpiar (espacios o separadores '-' / '.')
+    normalizadas: int = 0
+    # Filas sin fecha o con una fecha que ningún formato reconoce
+    descartadas: int = 0
+    ejemplos: list = field(default_factory=list)
+
+    def combinar(self, otro):
+        formatos = dict(self.formatos)
+        for formato, n in otro.formatos.items():
+            formatos[formato] = formatos.get(formato, 0) + n
+        return ReporteFechas(
+            filas=self.filas + otro.filas,
+            unicas=self.unicas + otro.unicas,
+            formatos=formatos,
+            normalizadas=self.normalizadas + otro.normalizadas,
+            descartadas=self.descartadas + otro.descartadas,
+            ejemplos=(self.ejemplos + otro.ejemplos)[:_MAX_EJEMPLOS],
+        )
+
+    def como_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def desde_dict(cls, datos):
+        return cls(**datos) if datos else cls()
+
+
+def parsear_fechas(serie):
+    """Convierte una serie de cadenas a ``datetime64``.
+
+    Devuelve la serie parseada (``NaT`` donde no hubo formato válido) y un
+    :class:`ReporteFechas` con lo que se normalizó y lo que se descartó.
+    """
+    codigos, unicas = pd.factorize(serie, use_na_sentinel=True)
+    unicas = pd.Index(unicas, dtype="string")
+    limpias = unicas.str.strip().str.replace(r"[-.]", "/", regex=True)
+
+    parseadas = np.full(len(unicas), np.datetime64("NaT"), dtype="datetime64[ns]")
+    filas_por_unica = np.bincount(codigos[codigos >= 0], minlength=len(unicas))
+    formatos = {}
+    pendientes = np.ones(len(unicas), dtype=bool)
+    for formato, forma in FORMATOS.items():
+        candidatas = pendientes & limpias.str.fullmatch(forma).to_numpy(dtype=bool, na_value=False)
+        if not candidatas.any():
+            continue
+        valores = pd.to_datetime(limpias[candidatas], format=formato, errors="coerce")
+        parseadas[candidatas] = valores.to_numpy(dtype="datetime64[ns]")
+        validas = np.flatnonzero(candidatas)[~valores.isna()]
+        pendientes[validas] = False
+        formatos[formato] = int(filas_por_unica[validas].sum())
+
+    cambiadas = (limpias != unicas).to_numpy(dtype=bool, na_value=False) & ~pendientes
+    reporte = ReporteFechas(
+        filas=len(codigos),
+        unicas=len(unicas),
+        formatos=formatos,
+        normalizadas=int(filas_por_unica[cambiadas].sum()),
+        descartadas=int(filas_por_unica[pendientes].sum() + (codigos < 0).sum()),
+        ejemplos=unicas[pendientes][:_MAX_EJEMPLOS].tolist(),
+    )
+
+    fechas = np.full(len(codigos), np.datetime64("NaT"), dtype="datetime64[ns]")
+    fechas[codigos >= 0] = parseadas[codigos[codigos >= 0]]
+    return pd.Series(fechas, index=serie.index, name=serie.name), reporte
@@ -0,0 +1,70 @@
+"""Caché LRU de figuras Plotly compartida entre sesiones.
+
+Construir una figura con ``plotly.express`` (validación de trazas, plantilla,
+layout) cuesta más que calcular sus datos desde el cubo. Como muchos
+operadores recorren las mismas vistas, las figuras se guardan por una llave
+con los parámetros de la vista y la versión de los datos, con un tope de
+entradas y de memoria; al rebasarlo se expulsan las menos usadas.
+
+Se guarda la figura ya serializada (su JSON), que se calcula una sola vez al
+construirla: es lo que se envía al navegador y lo que se cuenta contra el
+tope de memoria.
+"""
+import threading
+from collections import OrderedDict
+
+
+class CacheFiguras:
+    def __init__(self, max_entradas=256, max_bytes=64 * 1024 * 1024):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._figuras = OrderedDict()  # llave -> (JSON, bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, llave, construir):
+        """JSON de la figura de ``llave``; si no está, la construye con ``construir()``.
+
+        ``construir`` devuelve una figura de Plotly; todo el ``update_layout``
+        va dentro de ella, porque después solo se guarda su JSON.
+        """
+        with self._lock:
+            if llave in self._figuras:
+                self._figuras.move_to_end(llave)
+                self.aciertos += 1
+                return self._figuras[llave][0]
+            self.fallos += 1
+
+        # Se construye fuera del lock: otras sesiones no esperan por esta figura
+        # La validación ya ocurrió al construirla; serializar no la repite
+        figura = construir().to_json(validate=False)
+        tamano = len(figura)
+        with self._lock:
+            if llave not in self._figuras and tamano <= self.max_bytes:
+                self._figuras[llave] = (figura, tamano)
+                self._bytes += tamano
+                self._expulsar()
+        return figura
+
+    def _expulsar(self):
+        while len(self._figuras) > self.max_entradas or self._bytes > self.max_bytes:
+            _, (_, tamano) = self._figuras.popitem(last=False)
+            self._bytes -= tamano
+
+    def limpiar(self):
+        with self._lock:
+            self._figuras.clear()
+            self._bytes = 0
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._figuras),
+                "bytes": self._bytes,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+            }
@@ -0,0 +1,44 @@
+"""Rebanado por periodo con búsqueda binaria sobre tablas ordenadas.
+
+Las filas crudas se guardan ordenadas por (fecha, nombre_playa) y todas las
+tablas del cubo quedan ordenadas por (año, mes, ...). Así un año o un mes es
+un rango contiguo de filas que se localiza con ``searchsorted`` en O(log n) y
+se devuelve como rebanada posicional, sin máscaras booleanas ni copias.
+"""
+import numpy as np
+
+
+def ordenar_por_fecha(df):
+    return df.sort_values(["fecha", "nombre_playa"], kind="stable", ignore_index=True)
+
+
+def _rango(valores, valor, inicio, fin):
+    tramo = valores[inicio:fin]
+    return (inicio + int(np.searchsorted(tramo, valor, side="left")),
+            inicio + int(np.searchsorted(tramo, valor, side="right")))
+
+
+def rango_periodo(tabla, año=None, mes=None):
+    """Posiciones [inicio, fin) de las filas del periodo en una tabla ordenada."""
+    if mes is not None and año is None:
+        raise ValueError("Para rebanar por mes también se necesita el año")
+
+    inicio, fin = 0, len(tabla)
+    if año is not None:
+        inicio, fin = _rango(tabla["año"].to_numpy(), año, inicio, fin)
+    if mes is not None:
+        inicio, fin = _rango(tabla["mes"].to_numpy(), mes, inicio, fin)
+    return inicio, fin
+
+
+def rebanar_periodo(tabla, año=None, mes=None):
+    inicio, fin = rango_periodo(tabla, año, mes)
+    return tabla.iloc[inicio:fin]
+
+
+def rango_fechas(tabla, desde=None, hasta=None):
+    """Posiciones [inicio, fin) de las filas con ``desde <= fecha <= hasta``."""
+    fechas = tabla["fecha"].to_numpy()
+    inicio = 0 if desde is None else int(np.searchsorted(fechas, np.datetime64(desde, "ns"), side="left"))
+    fin = len(fechas) if hasta is None else int(np.searchsorted(fechas, np.datetime64(hasta, "ns"), side="right"))
+    return inicio, max(inicio, fin)
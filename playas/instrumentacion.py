@@ -0,0 +1,226 @@
+"""Tramos con nombre y tiempos por ejecución del dashboard.
+
+Cada ejecución de una página (cada *rerun* de Streamlit) abre una
+:class:`Medicion` con :func:`iniciar`; el código envuelve sus pasos en
+``with tramo("carga"):``, ``tramo("filtro")``, ``tramo("agregacion")``, etc.
+Los tramos se anidan (``carga/cubo``) y, fuera de una medición, no hacen
+nada, así que las funciones de ``playas`` pueden instrumentarse sin depender
+de la página.
+
+Las consultas a cachés se registran con ``with cache("datos"):``; si dentro
+se llama a :func:`fallo` (p. ej. al inicio de la función cacheada, que solo
+corre cuando no hay acierto), cuenta como fallo.
+
+Streamlit corre cada sesión en su propio hilo, así que la medición en curso
+es local al hilo. Al terminar, cada medición se acumula en :data:`registro`
+(compartido por todo el proceso) y se emite como una línea JSON por el logger
+``playas.tiempos``; con la variable de entorno ``PLAYAS_TIEMPOS=<archivo>``
+esas líneas se agregan además a ese archivo.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pandas as pd
+
+logger = logging.getLogger("playas.tiempos")
+
+_actual = threading.local()
+
+
+class Medicion:
+    def __init__(self, pagina):
+        self.pagina = pagina
+        self.fecha = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+        self.tramos = []  # (nombre, segundos), en el orden en que terminan
+        self.caches = {}  # nombre -> [aciertos, fallos]
+        self.total = None
+        self._inicio = time.perf_counter()
+        self._pila = []
+        self._consultas = []
+
+    @contextmanager
+    def tramo(self, nombre):
+        self._pila.append(nombre)
+        nombre = "/".join(self._pila)
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.tramos.append((nombre, time.perf_counter() - inicio))
+            self._pila.pop()
+
+    @contextmanager
+    def cache(self, nombre):
+        consulta = [nombre, True]
+        self._consultas.append(consulta)
+        try:
+            yield
+        finally:
+            self._consultas.pop()
+            conteo = self.caches.setdefault(nombre, [0, 0])
+            conteo[0 if consulta[1] else 1] += 1
+
+    def fallo(self):
+        if self._consultas:
+            self._consultas[-1][1] = False
+
+    def terminar(self):
+        self.total = time.perf_counter() - self._inicio
+        return self
+
+    def como_dict(self):
+        tramos = {}
+        for nombre, segundos in self.tramos:
+            tramos[nombre] = tramos.get(nombre, 0.0) + segundos
+        return {
+            "pagina": self.pagina,
+            "fecha": self.fecha,
+            "total": self.total,
+            "tramos": tramos,
+            "caches": {nombre: {"aciertos": a, "fallos": f} for nombre, (a, f) in self.caches.items()},
+        }
+
+    def tabla(self):
+        """Tramos de esta ejecución (sumados por nombre) en milisegundos."""
+        tramos = self.como_dict()["tramos"]
+        return pd.DataFrame({"tramo": list(tramos), "ms": [s * 1000 for s in tramos.values()]})
+
+
+class Registro:
+    """Acumulado de las mediciones del proceso, para todas las sesiones."""
+
+    def __init__(self, recientes=100):
+        self._lock = threading.Lock()
+        self._recientes = deque(maxlen=recientes)
+        self._tramos = {}  # (pagina, tramo) -> [n, total, maximo]
+        self._caches = {}  # nombre -> [aciertos, fallos]
+
+    def agregar(self, medicion):
+        datos = medicion.como_dict()
+        with self._lock:
+            self._recientes.append(datos)
+            for nombre, segundos in datos["tramos"].items():
+                acumulado = self._tramos.setdefault((medicion.pagina, nombre), [0, 0.0, 0.0])
+                acumulado[0] += 1
+                acumulado[1] += segundos
+                acumulado[2] = max(acumulado[2], segundos)
+            for nombre, conteo in datos["caches"].items():
+                acumulado = self._caches.setdefault(nombre, [0, 0])
+                acumulado[0] += conteo["aciertos"]
+                acumulado[1] += conteo["fallos"]
+        return datos
+
+    def resumen(self):
+        """Tramos acumulados por página, del que más tiempo suma al que menos."""
+        with self._lock:
+            filas = [(pagina, tramo, n, total * 1000, total / n * 1000, maximo * 1000)
+                     for (pagina, tramo), (n, total, maximo) in self._tramos.items()]
+        tabla = pd.DataFrame(filas, columns=["pagina", "tramo", "n", "total_ms", "promedio_ms", "max_ms"])
+        return tabla.sort_values("total_ms", ascending=False, ignore_index=True)
+
+    def tasas_cache(self):
+        with self._lock:
+            filas = [(nombre, a, f, a / (a + f) if a + f else 0.0)
+                     for nombre, (a, f) in self._caches.items()]
+        return pd.DataFrame(filas, columns=["cache", "aciertos", "fallos", "tasa_aciertos"])
+
+    def exportar(self):
+        """JSON con las ejecuciones recientes y los acumulados."""
+        with self._lock:
+            recientes = list(self._recientes)
+        return json.dumps({
+            "recientes": recientes,
+            "tramos": self.resumen().to_dict(orient="records"),
+            "caches": self.tasas_cache().to_dict(orient="records"),
+        }, ensure_ascii=False, indent=2)
+
+    def limpiar(self):
+        with self._lock:
+            self._recientes.clear()
+            self._tramos.clear()
+            self._caches.clear()
+
+
+registro = Registro()
+
+if os.environ.get("PLAYAS_TIEMPOS"):
+    _archivo = logging.FileHandler(os.environ["PLAYAS_TIEMPOS"], encoding="utf-8")
+    _archivo.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_archivo)
+    logger.setLevel(logging.INFO)
+
+
+def iniciar(pagina):
+    """Abre la medición de esta ejecución de ``pagina`` en el hilo actual."""
+    _actual.medicion = Medicion(pagina)
+    return _actual.medicion
+
+
+def actual():
+    return getattr(_actual, "medicion", None)
+
+
+def terminar():
+    """Cierra la medición en curso, la acumula en :data:`registro` y la emite al log."""
+    medicion = actual()
+    if medicion is None:
+        return None
+    _actual.medicion = None
+    datos = registro.agregar(medicion.terminar())
+    logger.info(json.dumps(datos, ensure_ascii=False))
+    return medicion
+
+
+@contextmanager
+def tramo(nombre):
+    medicion = actual()
+    if medicion is None:
+        yield
+        return
+    with medicion.tramo(nombre):
+        yield
+
+
+@contextmanager
+def cache(nombre):
+    medicion = actual()
+    if medicion is None:
+        yield
+        return
+    with medicion.cache(nombre):
+        yield
+
+
+def fallo():
+    """Marca como fallo la consulta de caché abierta más interna."""
+    medicion = actual()
+    if medicion is not None:
+        medicion.fallo()
+
+
+def panel(contenedor, medicion, extra=None):
+    """Panel de depuración opcional en ``contenedor`` (p. ej. ``st.sidebar``).
+
+    Se activa con un interruptor; muestra los tramos de la ejecución
+    ``medicion`` (ya terminada), las tasas de acierto de las cachés y los
+    acumulados del proceso, con un botón para exportarlos en JSON.
+    ``extra`` es un diccionario opcional que se muestra tal cual.
+    """
+    if not contenedor.toggle("⏱️ Tiempos de ejecución", key="instrumentacion_panel"):
+        return
+    contenedor.caption(f"Esta ejecución: {medicion.total * 1000:,.0f} ms")
+    contenedor.dataframe(medicion.tabla().round(1), hide_index=True)
+    contenedor.caption("Cachés (acumulado del proceso)")
+    contenedor.dataframe(registro.tasas_cache().round(3), hide_index=True)
+    if extra:
+        contenedor.json(extra)
+    contenedor.caption("Tramos (acumulado del proceso)")
+    contenedor.dataframe(registro.resumen().round(1), hide_index=True)
+    contenedor.download_button("Exportar tiempos (JSON)", registro.exportar(),
+                               file_name="tiempos.json", mime="application/json")
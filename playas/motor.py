@@ -0,0 +1,147 @@
+"""Motor de análisis sin Streamlit: las vistas del dashboard como funciones puras.
+
+Todas las funciones reciben el cubo de agregados (``playas.almacen.cargar_cubo``)
+y devuelven DataFrames o diccionarios; no dependen de una sesión de Streamlit,
+así que sirven igual para la página de análisis, para scripts y para el modo
+por lotes, que calcula todas las vistas de todos los años y meses de una vez::
+
+    python -m playas.motor --salida reportes/
+"""
+import argparse
+import json
+import math
+from pathlib import Path
+
+from playas.agregados import (anual_por_playa, diario_por_playa, estadisticas_semana,
+                              mensual_por_playa, ranking_playas, serie_anual, serie_diaria,
+                              serie_mensual)
+from playas.almacen import cargar_cubo
+from playas.constantes import DATA, MESES
+
+__all__ = [
+    "serie_diaria", "serie_mensual", "serie_anual",
+    "diario_por_playa", "mensual_por_playa", "anual_por_playa", "ranking_playas",
+    "mapa_calor", "estadisticas_semana", "insights_semana", "resumen_serie",
+    "vistas", "generar_reporte",
+]
+
+
+def mapa_calor(cubo, año, nombres_meses=MESES):
+    """Matriz playa × mes con la ocupación total del año (meses en orden de calendario)."""
+    return pivote_mapa_calor(mensual_por_playa(cubo, año), nombres_meses)
+
+
+def pivote_mapa_calor(serie, nombres_meses=MESES):
+    """La matriz de :func:`mapa_calor` a partir de la tabla de ``mensual_por_playa``."""
+    pivote = serie.pivot(index="nombre_playa", columns="mes", values="ocupacion").fillna(0)
+    pivote.columns = [nombres_meses[mes - 1] for mes in pivote.columns]
+    return pivote
+
+
+def resumen_serie(serie, etiqueta):
+    """Total, promedio, máximo, mínimo, mejor/peor punto y crecimiento de una serie.
+
+    ``etiqueta`` es la columna que identifica cada punto (fecha, mes, año).
+    """
+    valores = serie["ocupacion"]
+    inicial = valores.iloc[0]
+    return {
+        "total": _nativo(valores.sum()),
+        "promedio": _nativo(valores.mean()),
+        "maximo": _nativo(valores.max()),
+        "minimo": _nativo(valores.min()),
+        "mejor": _nativo(serie[etiqueta].iloc[valores.argmax()]),
+        "peor": _nativo(serie[etiqueta].iloc[valores.argmin()]),
+        "crecimiento": (valores.iloc[-1] / inicial - 1) * 100 if inicial else math.nan,
+    }
+
+
+def insights_semana(estadisticas):
+    """Días más y menos ocupados, el más variable y la variabilidad (%) de cada día."""
+    variabilidad = estadisticas["std"] / estadisticas["mean"] * 100
+    return {
+        "dia_mas_ocupado": _dia(estadisticas["sum"], "idxmax"),
+        "dia_menos_ocupado": _dia(estadisticas["sum"], "idxmin"),
+        "dia_mas_variable": _dia(estadisticas["std"], "idxmax"),
+        "variabilidad": variabilidad.round(1).to_dict(),
+    }
+
+
+def _dia(serie, metodo):
+    # Un periodo sin datos no tiene día más (ni menos) ocupado: None, no NaN
+    return None if serie.isna().all() else getattr(serie, metodo)()
+
+
+def _nativo(valor):
+    # Tipos de numpy/pandas a tipos de Python para poder serializar a JSON
+    if hasattr(valor, "isoformat"):
+        return valor.isoformat()
+    return valor.item() if hasattr(valor, "item") else valor
+
+
+def vistas(cubo):
+    """Recorre todas las vistas del dashboard como pares (nombre, DataFrame)."""
+    yield "temporal/anual", serie_anual(cubo)
+    yield "playa/anual", anual_por_playa(cubo)
+    yield "playa/totales", ranking_playas(anual_por_playa(cubo)).reset_index()
+    yield "semana/todos", estadisticas_semana(cubo)
+
+    for año in cubo.años:
+        yield f"temporal/mensual_{año}", serie_mensual(cubo, año)
+        yield f"playa/mensual_{año}", mensual_por_playa(cubo, año)
+        yield f"playa/mapa_calor_{año}", mapa_calor(cubo, año)
+        yield f"semana/{año}", estadisticas_semana(cubo, año)
+
+        for mes in cubo.meses(año):
+            sufijo = f"{año}_{mes:02d}"
+            diario = diario_por_playa(cubo, año, mes)
+            yield f"temporal/diario_{sufijo}", serie_diaria(cubo, año, mes)
+            yield f"playa/diario_{sufijo}", diario
+            yield f"playa/ranking_{sufijo}", ranking_playas(diario).reset_index()
+            yield f"semana/{sufijo}", estadisticas_semana(cubo, año, mes)
+
+
+def _resumenes(cubo):
+    resumen = {"anual": resumen_serie(serie_anual(cubo), "año"),
+               "semana": insights_semana(estadisticas_semana(cubo))}
+    for año in cubo.años:
+        resumen[str(año)] = resumen_serie(serie_mensual(cubo, año), "mes")
+    return resumen
+
+
+def generar_reporte(cubo, salida):
+    """Escribe cada vista como CSV en ``salida`` más un ``resumen.json``.
+
+    Devuelve la lista de archivos escritos.
+    """
+    salida = Path(salida)
+    archivos = []
+    for nombre, tabla in vistas(cubo):
+        ruta = salida / f"{nombre}.csv"
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        # Mapas de calor y estadísticas semanales llevan la playa / el día en el índice
+        tabla.to_csv(ruta, index=nombre.startswith(("playa/mapa_calor", "semana/")))
+        archivos.append(ruta)
+
+    ruta = salida / "resumen.json"
+    ruta.write_text(json.dumps(_resumenes(cubo), ensure_ascii=False, indent=2, default=_nativo),
+                    encoding="utf-8")
+    archivos.append(ruta)
+    return archivos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Calcula todas las vistas del dashboard y las guarda en disco."
+    )
+    parser.add_argument("--salida", type=Path, default=Path("reportes"),
+                        help="directorio de salida (default: reportes/)")
+    parser.add_argument("--datos", type=Path, default=DATA, help="CSV base de ocupación, o directorio / glob de CSV particionados")
+    args = parser.parse_args(argv)
+
+    archivos = generar_reporte(cargar_cubo(args.datos), args.salida)
+    print(f"{len(archivos)} archivos escritos en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
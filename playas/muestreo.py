@@ -0,0 +1,87 @@
+"""Reducción de series largas para las gráficas de líneas (LTTB).
+
+Una gráfica no puede mostrar más puntos que píxeles de ancho. Cuando una
+serie trae más, se reduce con *Largest-Triangle-Three-Buckets*: se divide en
+cubetas y de cada una se conserva el punto que forma el triángulo de mayor
+área con sus vecinos, lo que mantiene visibles los picos y los valles.
+
+El presupuesto es por figura: con varias series (una por playa) cada una
+recibe ``PUNTOS_POR_FIGURA // series``, así que lo que se envía al navegador
+no crece con el número de playas.
+"""
+import numpy as np
+
+# Ancho aproximado (en píxeles) de una gráfica a lo ancho de la página; no
+# tiene sentido enviar más puntos por serie que esto.
+PUNTOS_POR_SERIE = 1000
+# Puntos de todas las series juntas en una figura
+PUNTOS_POR_FIGURA = 2000
+# Arriba de estos puntos en la figura las líneas van sin marcadores
+MAX_MARCADORES = 400
+
+
+def lttb(y, puntos, x=None):
+    """Índices (ordenados) de los ``puntos`` que conserva LTTB sobre ``y``."""
+    n = len(y)
+    if puntos >= n or puntos < 3:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype="float64")
+    x = np.arange(n, dtype="float64") if x is None else np.asarray(x, dtype="float64")
+    # El primero y el último se conservan; el resto se reparte en puntos - 2 cubetas
+    bordes = np.linspace(1, n - 1, puntos - 1).astype(np.int64)
+
+    indices = np.empty(puntos, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    elegido = 0
+    for i in range(puntos - 2):
+        inicio, fin = bordes[i], bordes[i + 1]
+        # Vértice de referencia: el promedio de la cubeta siguiente
+        sig_inicio, sig_fin = (bordes[i + 1], bordes[i + 2]) if i + 2 < len(bordes) else (n - 1, n)
+        x_sig, y_sig = x[sig_inicio:sig_fin].mean(), y[sig_inicio:sig_fin].mean()
+
+        areas = np.abs((x[elegido] - x_sig) * (y[inicio:fin] - y[elegido])
+                       - (x[elegido] - x[inicio:fin]) * (y_sig - y[elegido]))
+        elegido = inicio + int(np.argmax(areas))
+        indices[i + 1] = elegido
+    return indices
+
+
+def presupuesto(df, por=None, puntos=PUNTOS_POR_FIGURA):
+    """Puntos por serie para que todas las series de ``df`` quepan en ``puntos``."""
+    series = 1 if por is None else max(df[por].nunique(), 1)
+    # LTTB necesita al menos 3 puntos por serie (el primero, el último y uno)
+    return max(min(PUNTOS_POR_SERIE, puntos // series), 3)
+
+
+def reducir(df, x, y, puntos=None, por=None):
+    """Reduce cada serie de ``df`` (una por valor de ``por``) a lo más ``puntos``.
+
+    Sin ``puntos`` se usa :func:`presupuesto`. ``df`` debe venir ordenado por
+    ``x`` dentro de cada serie. Las series que ya caben se devuelven completas.
+    """
+    puntos = presupuesto(df, por) if puntos is None else puntos
+    if not necesita_reduccion(df, puntos, por):
+        return df
+
+    valores_x = df[x].to_numpy()
+    if np.issubdtype(valores_x.dtype, np.datetime64):
+        valores_x = valores_x.astype("int64")
+    valores_y = df[y].to_numpy()
+
+    # Posiciones de las filas de cada serie dentro de df
+    grupos = [np.arange(len(df))] if por is None else df.groupby(por, observed=True).indices.values()
+    posiciones = [filas[lttb(valores_y[filas], puntos, valores_x[filas])] for filas in grupos]
+    return df.iloc[np.sort(np.concatenate(posiciones))]
+
+
+def necesita_reduccion(df, puntos=None, por=None):
+    puntos = presupuesto(df, por) if puntos is None else puntos
+    if por is None:
+        return len(df) > puntos
+    return bool((df.groupby(por, observed=True).size() > puntos).any())
+
+
+def con_marcadores(df):
+    """Si la figura de ``df`` es lo bastante chica para dibujar un marcador por punto."""
+    return len(df) <= MAX_MARCADORES
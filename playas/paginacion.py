@@ -0,0 +1,73 @@
+"""Consultas paginadas sobre las filas de ocupación para la tabla de datos.
+
+Los filtros y el orden se resuelven aquí, del lado del servidor, y solo la
+página visible se entrega a ``st.dataframe``: el navegador nunca recibe el
+conjunto completo.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from playas.indice import rango_fechas
+
+COLUMNAS_TABLA = ["fecha", "nombre_playa", "ocupacion", "dia_semana"]
+
+
+@dataclass
+class Pagina:
+    filas: object  # DataFrame con a lo más ``tamano`` filas
+    total: int
+    pagina: int
+    paginas: int
+    inicio: int  # posición (base 0) de la primera fila dentro del resultado
+
+
+def consultar_pagina(df, playas=None, desde=None, hasta=None, ocupacion_min=None,
+                     ocupacion_max=None, orden="fecha", descendente=False,
+                     pagina=1, tamano=50):
+    """Filtra, ordena y devuelve solo la página ``pagina`` (base 1) del resultado.
+
+    ``df`` debe estar ordenado por fecha: el rango de fechas se resuelve con
+    búsqueda binaria y el resto de filtros se evalúa solo sobre ese tramo.
+    """
+    inicio, fin = rango_fechas(df, desde, hasta)
+    tramo = df.iloc[inicio:fin]
+
+    mascara = np.ones(len(tramo), dtype=bool)
+    if playas:
+        mascara &= tramo["nombre_playa"].isin(playas).to_numpy()
+    ocupacion = tramo["ocupacion"].to_numpy()
+    if ocupacion_min is not None:
+        mascara &= ocupacion >= ocupacion_min
+    if ocupacion_max is not None:
+        mascara &= ocupacion <= ocupacion_max
+    posiciones = np.flatnonzero(mascara)
+
+    if orden == "fecha":
+        # Las filas ya vienen ordenadas por (fecha, nombre_playa)
+        if descendente:
+            posiciones = posiciones[::-1]
+    else:
+        posiciones = posiciones[_orden_estable(tramo[orden], posiciones, descendente)]
+
+    total = len(posiciones)
+    paginas = max(1, -(-total // tamano))
+    pagina = min(max(1, pagina), paginas)
+    desde_fila = (pagina - 1) * tamano
+    filas = tramo.iloc[posiciones[desde_fila:desde_fila + tamano]][COLUMNAS_TABLA]
+    return Pagina(filas.reset_index(drop=True), total, pagina, paginas, desde_fila)
+
+
+def _orden_estable(columna, posiciones, descendente):
+    # Categorías ordenadas (días) van por su código; las demás (playas) por
+    # nombre, porque los lotes pueden agregar categorías al final.
+    if hasattr(columna, "cat"):
+        claves = columna.cat.codes.to_numpy()[posiciones]
+        if not columna.cat.ordered:
+            claves = np.argsort(np.argsort(columna.cat.categories.to_numpy()))[claves]
+    else:
+        claves = columna.to_numpy()[posiciones]
+    if descendente:
+        # Invertir y volver a invertir conserva la estabilidad en orden descendente
+        return (len(claves) - 1 - np.argsort(claves[::-1], kind="stable"))[::-1]
+    return np.argsort(claves, kind="stable")
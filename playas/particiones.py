@@ -0,0 +1,115 @@
+"""Fuentes particionadas: un directorio o un patrón glob de CSV con el mismo esquema.
+
+Cuando los datos llegan como un archivo por playa o por mes, cada archivo se
+parsea en un proceso aparte: cada uno deja su caché Parquet tipada y su cubo
+de agregados, y el proceso principal los combina. La combinación es
+determinista: los archivos se recorren en orden de ruta, las filas quedan
+ordenadas por (fecha, nombre_playa) con orden estable y las tablas del cubo
+salen de un ``groupby`` ordenado, así que el resultado no depende de qué
+proceso termina primero.
+
+El esquema de salida es el mismo que el de un solo CSV (``playas.carga``).
+"""
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+
+from playas import agregados
+from playas.carga import (VERSION_ESQUEMA, _stat, asegurar_cache, cargar_base, concatenar,
+                          huella_archivo, iterar_base)
+from playas.indice import ordenar_por_fecha
+
+
+def es_particionada(ruta):
+    """``True`` si ``ruta`` es un directorio o un patrón glob en lugar de un archivo."""
+    return Path(ruta).is_dir() or glob.has_magic(str(ruta))
+
+
+def archivos(ruta):
+    """Archivos CSV de la fuente, en orden de ruta."""
+    if Path(ruta).is_dir():
+        encontrados = sorted(Path(ruta).glob("*.csv"))
+    else:
+        encontrados = sorted(Path(p) for p in glob.glob(str(ruta)))
+    if not encontrados:
+        raise FileNotFoundError(f"No hay archivos CSV en {ruta}")
+    return encontrados
+
+
+def version(ruta):
+    """Tamaño total y mtime más reciente de los archivos; ``None`` si no hay ninguno."""
+    try:
+        estados = [_stat(archivo) for archivo in archivos(ruta)]
+    except FileNotFoundError:
+        return None
+    return sum(tamano for tamano, _ in estados), max(mtime for _, mtime in estados)
+
+
+def huella(ruta):
+    """Huella de la fuente completa, con las mismas llaves que ``huella_archivo``."""
+    huellas = [(archivo.name, huella_archivo(archivo)) for archivo in archivos(ruta)]
+    resumen = json.dumps([(nombre, h["hash"]) for nombre, h in huellas])
+    return {
+        "version": VERSION_ESQUEMA,
+        "tamano": sum(h["tamano"] for _, h in huellas),
+        "mtime_ns": max(h["mtime_ns"] for _, h in huellas),
+        "hash": hashlib.blake2b(resumen.encode(), digest_size=16).hexdigest(),
+    }
+
+
+def _cache_particion(archivo, cache_dir):
+    # Un subdirectorio por directorio de origen: dos archivos con el mismo
+    # nombre en carpetas distintas no comparten caché
+    origen = hashlib.blake2b(str(Path(archivo).resolve().parent).encode(), digest_size=4).hexdigest()
+    return Path(cache_dir) / "particiones" / origen
+
+
+def _preparar(archivo, cache_dir):
+    # Corre en un proceso del pool: parsea el CSV solo si su caché no está vigente
+    asegurar_cache(archivo, _cache_particion(archivo, cache_dir))
+
+
+def _cubo(archivo, cache_dir):
+    return agregados.construir_cubo_por_bloques(
+        iterar_base(archivo, _cache_particion(archivo, cache_dir)))
+
+
+def _en_paralelo(funcion, rutas, cache_dir, procesos):
+    procesos = min(procesos or os.cpu_count() or 1, len(rutas))
+    if procesos <= 1:
+        return [funcion(archivo, cache_dir) for archivo in rutas]
+    # Nunca 'fork': el servidor de Streamlit tiene hilos vivos y candados
+    # tomados (logging, Tornado) que el hijo heredaría bloqueados
+    metodo = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    with ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context(metodo)) as pool:
+        return list(pool.map(funcion, rutas, repeat(cache_dir)))
+
+
+def cargar_base_particionada(ruta, cache_dir, procesos=None):
+    """Filas tipadas de todos los archivos, ordenadas por (fecha, nombre_playa).
+
+    Los CSV se parsean en paralelo (``procesos``, por omisión uno por núcleo);
+    después cada caché Parquet se lee aquí, que es rápido y evita pasar las
+    filas entre procesos.
+    """
+    rutas = archivos(ruta)
+    _en_paralelo(_preparar, rutas, cache_dir, procesos)
+    df = concatenar([cargar_base(archivo, _cache_particion(archivo, cache_dir)) for archivo in rutas])
+    if not df["fecha"].is_monotonic_increasing:
+        df = ordenar_por_fecha(df)
+    return df
+
+
+def iterar_base_particionada(ruta, cache_dir):
+    for archivo in archivos(ruta):
+        yield from iterar_base(archivo, _cache_particion(archivo, cache_dir))
+
+
+def construir_cubo_particionado(ruta, cache_dir, procesos=None):
+    """Cubo de agregados de todos los archivos: uno por proceso, combinados al final."""
+    return agregados.combinar_cubos(_en_paralelo(_cubo, archivos(ruta), cache_dir, procesos))
@@ -0,0 +1,185 @@
+"""Pronóstico de ocupación diaria por playa con modelos estacionales vectorizados.
+
+Cada playa se modela sobre ``log(1 + ocupación)`` diaria como
+
+    nivel + tendencia·t + efecto del día de la semana + efecto del mes
+
+y todas las playas se ajustan a la vez: la matriz de diseño es la misma para
+todas (una fila por día), así que las ecuaciones normales de cada playa se
+arman con un solo ``einsum`` y se invierten juntas con ``np.linalg.inv`` (la
+inversa también da la incertidumbre de los coeficientes para los intervalos).
+Los días sin registro de una playa solo pesan cero en su sistema.
+
+Los parámetros ajustados (coeficientes, varianza residual y la inversa de
+cada sistema para los intervalos) se guardan en
+``datos/.cache/pronostico/<versión del cubo>.npz``; pronosticar los siguientes
+N días es un producto de matrices::
+
+    python -m playas.pronostico --dias 14 --salida pronostico.csv
+"""
+import argparse
+import os
+from dataclasses import dataclass, fields
+from pathlib import Path
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from playas.agregados import matriz_diaria
+from playas.almacen import cargar_cubo, leer_manifiesto
+from playas.constantes import CACHE_DIR, DATA
+
+# Regularización mínima para playas con pocos días (sistemas casi singulares)
+_RIDGE = 1e-3
+_DIAS_POR_AÑO = 365.25
+
+
+@dataclass
+class Modelo:
+    playas: np.ndarray  # nombres, en el orden de las filas de los demás arreglos
+    origen: np.datetime64  # t = 0 de la tendencia
+    ultima_fecha: np.datetime64
+    coeficientes: np.ndarray  # playas × variables
+    sigma: np.ndarray  # desviación residual por playa (escala log)
+    inversa: np.ndarray  # playas × variables × variables: (XᵀWX)⁻¹
+    dias: np.ndarray  # días con datos por playa
+
+
+def diseño(fechas, origen):
+    """Matriz de diseño: constante, tendencia (años), 6 días de la semana y 11 meses."""
+    fechas = pd.DatetimeIndex(fechas)
+    t = (fechas - pd.Timestamp(origen)).days.to_numpy() / _DIAS_POR_AÑO
+    dia = fechas.weekday.to_numpy()
+    mes = fechas.month.to_numpy()
+    return np.column_stack([
+        np.ones(len(fechas)),
+        t,
+        # Lunes y enero son la referencia
+        dia[:, None] == np.arange(1, 7),
+        mes[:, None] == np.arange(2, 13),
+    ]).astype("float64")
+
+
+def ajustar(cubo):
+    """Ajusta el modelo de todas las playas a partir de la tabla ``diario`` del cubo."""
+    matriz = matriz_diaria(cubo)
+    fechas = matriz.index
+
+    y = np.log1p(matriz.to_numpy(dtype="float64"))  # días × playas
+    pesos = ~np.isnan(y)
+    y = np.where(pesos, y, 0.0)
+    x = diseño(fechas, fechas[0])  # días × variables
+
+    # Ecuaciones normales de todas las playas: (XᵀWₚX) βₚ = XᵀWₚyₚ
+    gram = np.einsum("dk,dl,dp->pkl", x, x, pesos, optimize=True)
+    gram += _RIDGE * np.eye(x.shape[1])
+    inversa = np.linalg.inv(gram)
+    coeficientes = np.einsum("pkl,dl,dp->pk", inversa, x, y * pesos, optimize=True)
+
+    residuos = (y - x @ coeficientes.T) * pesos
+    dias = pesos.sum(axis=0)
+    sigma = np.sqrt((residuos ** 2).sum(axis=0) / np.maximum(dias - x.shape[1], 1))
+
+    return Modelo(
+        playas=matriz.columns.astype(str).to_numpy(),
+        origen=np.datetime64(fechas[0], "D"),
+        ultima_fecha=np.datetime64(fechas[-1], "D"),
+        coeficientes=coeficientes,
+        sigma=sigma,
+        inversa=inversa,
+        dias=dias,
+    )
+
+
+def pronosticar(modelo, dias=14, nivel=0.9):
+    """Pronóstico de los ``dias`` siguientes a la última fecha, con intervalo ``nivel``.
+
+    Devuelve una fila por (fecha, playa) con el pronóstico y los límites del
+    intervalo de predicción, en personas.
+    """
+    fechas = pd.date_range(pd.Timestamp(modelo.ultima_fecha) + pd.Timedelta(days=1), periods=dias)
+    x = diseño(fechas, modelo.origen)  # días × variables
+    media = x @ modelo.coeficientes.T  # días × playas
+    # Varianza de predicción: ruido + incertidumbre de los coeficientes
+    varianza = modelo.sigma ** 2 * (1 + np.einsum("hk,pkl,hl->hp", x, modelo.inversa, x))
+    margen = NormalDist().inv_cdf(0.5 + nivel / 2) * np.sqrt(varianza)
+
+    return pd.DataFrame({
+        "fecha": np.repeat(fechas.to_numpy(), len(modelo.playas)),
+        "nombre_playa": np.tile(modelo.playas, dias),
+        "pronostico": np.expm1(media).ravel(),
+        "inferior": np.expm1(media - margen).clip(min=0).ravel(),
+        "superior": np.expm1(media + margen).ravel(),
+    }).round({"pronostico": 0, "inferior": 0, "superior": 0})
+
+
+def resumen_pronostico(tabla):
+    """Por playa: ocupación esperada en el horizonte, día pico y cota superior del pico.
+
+    Ordenado de mayor a menor ocupación esperada, para asignar personal.
+    """
+    pico = tabla.loc[tabla.groupby("nombre_playa", sort=False)["pronostico"].idxmax()]
+    resumen = pico.set_index("nombre_playa")[["fecha", "pronostico", "superior"]].rename(
+        columns={"fecha": "dia_pico", "pronostico": "pico", "superior": "pico_superior"})
+    resumen.insert(0, "total", tabla.groupby("nombre_playa", sort=False)["pronostico"].sum())
+    return resumen.sort_values("total", ascending=False)
+
+
+def guardar_modelo(modelo, ruta):
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_suffix(f".{os.getpid()}.tmp")
+    with open(temporal, "wb") as destino:
+        np.savez(destino, **{campo.name: getattr(modelo, campo.name) for campo in fields(Modelo)})
+    os.replace(temporal, ruta)
+
+
+def leer_modelo(ruta):
+    with np.load(ruta, allow_pickle=False) as datos:
+        return Modelo(**{campo.name: datos[campo.name] for campo in fields(Modelo)})
+
+
+def cargar_modelo(ruta=DATA, cache_dir=CACHE_DIR):
+    """Modelo ajustado a la versión vigente de los datos; se reajusta solo si cambió."""
+    cubo = cargar_cubo(ruta, cache_dir)
+    manifiesto = leer_manifiesto(cache_dir)
+    if not manifiesto or "cubo" not in manifiesto:
+        return ajustar(cubo)
+
+    archivo = Path(cache_dir) / "pronostico" / f"{manifiesto['cubo']}.npz"
+    try:
+        return leer_modelo(archivo)
+    except (OSError, KeyError, ValueError):
+        pass
+
+    modelo = ajustar(cubo)
+    try:
+        guardar_modelo(modelo, archivo)
+        for anterior in archivo.parent.glob("*.npz"):
+            if anterior != archivo:
+                anterior.unlink(missing_ok=True)
+    except OSError:
+        pass
+    return modelo
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pronostica la ocupación diaria de cada playa.")
+    parser.add_argument("--dias", type=int, default=14, help="días a pronosticar (default: 14)")
+    parser.add_argument("--nivel", type=float, default=0.9, help="nivel del intervalo (default: 0.9)")
+    parser.add_argument("--datos", type=Path, default=DATA,
+                        help="CSV base de ocupación, o directorio / glob de CSV particionados")
+    parser.add_argument("--salida", type=Path, help="CSV de salida (default: imprimir)")
+    args = parser.parse_args(argv)
+
+    tabla = pronosticar(cargar_modelo(args.datos), args.dias, args.nivel)
+    if args.salida:
+        tabla.to_csv(args.salida, index=False)
+        print(f"{len(tabla)} filas escritas en {args.salida}")
+    else:
+        print(tabla.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
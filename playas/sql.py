@@ -0,0 +1,418 @@
+"""Base SQL embebida con la historia de ocupación, para vistas y consultas ad hoc.
+
+Las filas del almacén (CSV base más lotes, ya validadas) se cargan por
+bloques en un archivo de base de datos local, uno por versión de los datos
+(``datos/.cache/sql/<versión>.sqlite``), con índices por ``fecha`` y por
+(``nombre_playa``, ``fecha``). Se usa DuckDB si está instalado (agrega fuera
+de memoria y en varios hilos) y SQLite, que viene con Python, si no.
+
+La tabla ``ocupacion`` tiene las columnas ``fecha``, ``"año"``, ``mes``,
+``dia_semana`` (0 = lunes … 6 = domingo), ``nombre_playa`` y ``ocupacion``.
+
+Las vistas del dashboard (:func:`serie_diaria`, :func:`estadisticas_semana`,
+etc.) tienen la misma firma y el mismo resultado que las de ``playas.motor``,
+pero se resuelven como una consulta en la base: con ``PLAYAS_SQL=1`` (o
+``sqlite`` / ``duckdb``) la página de análisis las usa en lugar del cubo.
+
+:func:`consulta_libre` ejecuta una sola sentencia ``SELECT`` sobre una
+conexión de solo lectura, con tope de filas y de tiempo::
+
+    python -m playas.sql "SELECT nombre_playa, SUM(ocupacion) FROM ocupacion GROUP BY 1"
+"""
+import argparse
+import importlib.util
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from playas import motor as _motor
+from playas.agregados import ESTADISTICAS
+from playas.almacen import iterar_datos, version_contenido
+from playas.constantes import CACHE_DIR, DATA, DIAS_SEMANA, MESES
+
+MOTORES = ("duckdb", "sqlite")
+TABLA = "ocupacion"
+# Topes de las consultas ad hoc
+LIMITE_FILAS = 10_000
+TIEMPO_MAXIMO = 10  # segundos
+
+_CREAR = f"""
+CREATE TABLE {TABLA} (
+    fecha DATE NOT NULL,
+    "año" INTEGER NOT NULL,
+    mes INTEGER NOT NULL,
+    dia_semana INTEGER NOT NULL,
+    nombre_playa VARCHAR NOT NULL,
+    ocupacion INTEGER NOT NULL
+)"""
+_INDICES = [
+    f"CREATE INDEX ix_{TABLA}_fecha ON {TABLA} (fecha)",
+    f"CREATE INDEX ix_{TABLA}_playa ON {TABLA} (nombre_playa, fecha)",
+]
+
+EJEMPLOS = {
+    "Top 3 playas los sábados en temporada alta": f"""\
+SELECT nombre_playa, SUM(ocupacion) AS ocupacion
+FROM {TABLA}
+WHERE dia_semana = 5 AND mes IN (7, 8, 12)
+GROUP BY nombre_playa
+ORDER BY ocupacion DESC
+LIMIT 3""",
+    "Crecimiento anual por playa": f"""\
+WITH anual AS (
+    SELECT nombre_playa, "año", SUM(ocupacion) AS ocupacion
+    FROM {TABLA}
+    GROUP BY nombre_playa, "año"
+)
+SELECT nombre_playa, "año", ocupacion,
+       ROUND(100.0 * ocupacion / LAG(ocupacion) OVER (PARTITION BY nombre_playa ORDER BY "año") - 100, 1)
+           AS crecimiento_pct
+FROM anual
+ORDER BY nombre_playa, "año\"""",
+    "Los 10 días más llenos": f"""\
+SELECT fecha, SUM(ocupacion) AS ocupacion
+FROM {TABLA}
+GROUP BY fecha
+ORDER BY ocupacion DESC
+LIMIT 10""",
+}
+
+
+def activo():
+    """``True`` si ``PLAYAS_SQL`` pide resolver las vistas en la base SQL."""
+    return os.environ.get("PLAYAS_SQL", "").lower() not in ("", "0", "no")
+
+
+def motor_preferido():
+    """``PLAYAS_SQL=sqlite|duckdb`` elige el motor; si no, DuckDB cuando está instalado."""
+    pedido = os.environ.get("PLAYAS_SQL", "").lower()
+    if pedido == "sqlite" or not _hay_duckdb():
+        return "sqlite"
+    return "duckdb"
+
+
+def _hay_duckdb():
+    # Sin importarlo: la página importa este módulo aunque no use la base
+    return importlib.util.find_spec("duckdb") is not None
+
+
+def _duckdb():
+    import duckdb
+    return duckdb
+
+
+class BaseSQL:
+    """Archivo de base de datos de una versión de los datos, abierto en solo lectura.
+
+    Cada hilo (cada sesión de Streamlit) usa su propia conexión. Expone
+    ``años``, ``meses(año)`` y ``playas`` como el cubo, así que las páginas
+    pueden usar una u otro.
+    """
+
+    def __init__(self, archivo, motor):
+        self.archivo = Path(archivo)
+        self.motor = motor
+        self._local = threading.local()
+        periodos = self.consultar(f'SELECT DISTINCT "año", mes FROM {TABLA} ORDER BY 1, 2')
+        self._meses = periodos.groupby("año")["mes"].apply(list).to_dict()
+        self.playas = self.consultar(
+            f"SELECT DISTINCT nombre_playa FROM {TABLA} ORDER BY 1")["nombre_playa"].tolist()
+
+    @property
+    def años(self):
+        return list(self._meses)
+
+    def meses(self, año):
+        return self._meses.get(año, [])
+
+    def _conexion(self):
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            conexion = self._local.conexion = _conectar_lectura(self.archivo, self.motor)
+        return conexion
+
+    def consultar(self, sql, parametros=(), limite=None, tiempo=None):
+        """Ejecuta ``sql`` y devuelve un DataFrame.
+
+        Con ``limite`` se leen a lo más ``limite`` filas; con ``tiempo`` (s) la
+        consulta se interrumpe al rebasarlo y lanza ``TimeoutError``.
+        """
+        conexion = self._conexion()
+        with _tope_de_tiempo(conexion, self.motor, tiempo):
+            cursor = conexion.execute(sql, parametros)
+            filas = cursor.fetchall() if limite is None else cursor.fetchmany(limite)
+        return pd.DataFrame(filas, columns=[columna[0] for columna in cursor.description])
+
+
+@contextmanager
+def _tope_de_tiempo(conexion, motor, tiempo):
+    """Interrumpe la consulta en curso si rebasa ``tiempo`` segundos."""
+    if tiempo is None:
+        yield
+        return
+    limite = time.monotonic() + tiempo
+    vencida = threading.Event()
+    if motor == "sqlite":
+        def revisar():
+            if time.monotonic() > limite:
+                vencida.set()
+            return vencida.is_set()
+        conexion.set_progress_handler(revisar, 10_000)
+    else:
+        def interrumpir():
+            vencida.set()
+            conexion.interrupt()
+        temporizador = threading.Timer(tiempo, interrumpir)
+        temporizador.start()
+    try:
+        yield
+    except Exception as e:
+        if vencida.is_set():
+            raise TimeoutError(f"La consulta rebasó {tiempo} s") from e
+        raise
+    finally:
+        if motor == "sqlite":
+            conexion.set_progress_handler(None, 0)
+        else:
+            temporizador.cancel()
+
+
+def _solo_lectura(accion, tabla, *_):
+    # Autorizador de SQLite: solo lectura de la tabla de ocupación y funciones
+    if accion in (sqlite3.SQLITE_SELECT, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE):
+        return sqlite3.SQLITE_OK
+    if accion == sqlite3.SQLITE_READ and tabla == TABLA:
+        return sqlite3.SQLITE_OK
+    return sqlite3.SQLITE_DENY
+
+
+def _conectar_lectura(archivo, motor):
+    if motor == "duckdb":
+        # Sin acceso a archivos externos: las consultas solo ven esta base
+        return _duckdb().connect(str(archivo), read_only=True,
+                              config={"enable_external_access": False})
+    conexion = sqlite3.connect(f"{Path(archivo).resolve().as_uri()}?mode=ro", uri=True)
+    conexion.set_authorizer(_solo_lectura)
+    return conexion
+
+
+def _insertar(conexion, motor, bloque):
+    filas = pd.DataFrame({
+        "fecha": bloque["fecha"],
+        "año": bloque["año"].astype("int64"),
+        "mes": bloque["mes"].astype("int64"),
+        "dia_semana": bloque["fecha"].dt.weekday.astype("int64"),
+        "nombre_playa": bloque["nombre_playa"].astype(str),
+        "ocupacion": bloque["ocupacion"].astype("int64"),
+    })
+    if motor == "duckdb":
+        conexion.register("bloque", filas)
+        conexion.execute(f'INSERT INTO {TABLA} SELECT CAST(fecha AS DATE), "año", mes, '
+                         "dia_semana, nombre_playa, ocupacion FROM bloque")
+        conexion.unregister("bloque")
+    else:
+        filas["fecha"] = filas["fecha"].dt.strftime("%Y-%m-%d")
+        conexion.executemany(f"INSERT INTO {TABLA} VALUES (?, ?, ?, ?, ?, ?)",
+                             zip(*(filas[columna].tolist() for columna in filas.columns)))
+
+
+def _construir(archivo, motor, ruta, cache_dir):
+    archivo.parent.mkdir(parents=True, exist_ok=True)
+    temporal = archivo.with_suffix(f".{os.getpid()}.tmp")
+    temporal.unlink(missing_ok=True)
+    conexion = _duckdb().connect(str(temporal)) if motor == "duckdb" else sqlite3.connect(temporal)
+    try:
+        conexion.execute(_CREAR)
+        for bloque in iterar_datos(ruta, cache_dir):
+            if len(bloque):
+                _insertar(conexion, motor, bloque)
+        for indice in _INDICES:
+            conexion.execute(indice)
+        if motor == "sqlite":
+            conexion.commit()
+    except BaseException:
+        conexion.close()
+        temporal.unlink(missing_ok=True)
+        raise
+    conexion.close()
+    os.replace(temporal, archivo)
+
+
+def abrir_base(ruta=DATA, cache_dir=CACHE_DIR, motor=None):
+    """Base SQL de la versión vigente de los datos; se construye solo si cambió."""
+    motor = motor or motor_preferido()
+    if motor == "duckdb" and not _hay_duckdb():
+        raise ImportError("DuckDB no está instalado (pip install duckdb)")
+    directorio = Path(cache_dir) / "sql"
+    archivo = directorio / f"{version_contenido(ruta, cache_dir)}.{motor}"
+    if not archivo.exists():
+        _construir(archivo, motor, ruta, cache_dir)
+        for anterior in directorio.glob(f"*.{motor}"):
+            if anterior != archivo:
+                try:
+                    anterior.unlink()
+                except OSError:
+                    pass
+    return BaseSQL(archivo, motor)
+
+
+# ----------------------------------------------------------------------
+# Vistas del dashboard como consultas (mismo resultado que playas.motor)
+# ----------------------------------------------------------------------
+
+def _periodo(año=None, mes=None):
+    # El periodo se filtra por rango de fechas para usar el índice de 'fecha'
+    if año is None:
+        return "", ()
+    if mes is None:
+        inicio, fin = pd.Timestamp(año, 1, 1), pd.Timestamp(año + 1, 1, 1)
+    else:
+        inicio = pd.Timestamp(año, mes, 1)
+        fin = inicio + pd.offsets.MonthBegin()
+    return "WHERE fecha >= ? AND fecha < ?", (f"{inicio:%Y-%m-%d}", f"{fin:%Y-%m-%d}")
+
+
+def _fechas(tabla):
+    tabla["fecha"] = pd.to_datetime(tabla["fecha"])
+    return tabla
+
+
+def serie_diaria(base, año, mes):
+    donde, parametros = _periodo(año, mes)
+    return _fechas(base.consultar(
+        f"SELECT fecha, SUM(ocupacion) AS ocupacion FROM {TABLA} {donde} "
+        "GROUP BY fecha ORDER BY fecha", parametros))
+
+
+def serie_mensual(base, año):
+    donde, parametros = _periodo(año)
+    return base.consultar(
+        f"SELECT mes, SUM(ocupacion) AS ocupacion FROM {TABLA} {donde} "
+        "GROUP BY mes ORDER BY mes", parametros)
+
+
+def serie_anual(base):
+    return base.consultar(
+        f'SELECT "año", SUM(ocupacion) AS ocupacion FROM {TABLA} GROUP BY "año" ORDER BY "año"')
+
+
+def diario_por_playa(base, año, mes):
+    donde, parametros = _periodo(año, mes)
+    return _fechas(base.consultar(
+        f"SELECT fecha, nombre_playa, SUM(ocupacion) AS ocupacion FROM {TABLA} {donde} "
+        "GROUP BY fecha, nombre_playa ORDER BY fecha, nombre_playa", parametros))
+
+
+def mensual_por_playa(base, año):
+    donde, parametros = _periodo(año)
+    return base.consultar(
+        f"SELECT mes, nombre_playa, SUM(ocupacion) AS ocupacion FROM {TABLA} {donde} "
+        "GROUP BY mes, nombre_playa ORDER BY mes, nombre_playa", parametros)
+
+
+def anual_por_playa(base):
+    return base.consultar(
+        f'SELECT "año", nombre_playa, SUM(ocupacion) AS ocupacion FROM {TABLA} '
+        'GROUP BY "año", nombre_playa ORDER BY "año", nombre_playa')
+
+
+def mapa_calor(base, año, nombres_meses=MESES):
+    """Matriz playa × mes con la ocupación total del año (meses en orden de calendario)."""
+    return _motor.pivote_mapa_calor(mensual_por_playa(base, año), nombres_meses)
+
+
+def estadisticas_semana(base, año=None, mes=None):
+    """Suma, promedio, mediana, desviación, mínimo, máximo y conteo por día.
+
+    La mediana sale del número de fila dentro de cada día (funciones de
+    ventana) y la varianza de las desviaciones a la media de cada día, así
+    que la consulta es la misma en SQLite y en DuckDB.
+    """
+    donde, parametros = _periodo(año, mes)
+    tabla = base.consultar(f"""
+        WITH filas AS (
+            SELECT dia_semana, ocupacion,
+                   ROW_NUMBER() OVER (PARTITION BY dia_semana ORDER BY ocupacion) AS r,
+                   COUNT(*) OVER (PARTITION BY dia_semana) AS n,
+                   AVG(ocupacion) OVER (PARTITION BY dia_semana) AS media
+            FROM {TABLA} {donde}
+        )
+        SELECT dia_semana,
+               SUM(ocupacion) AS "sum",
+               AVG(ocupacion) AS "mean",
+               AVG(CASE WHEN 2 * r BETWEEN n AND n + 2 THEN ocupacion END) AS "median",
+               SUM((ocupacion - media) * (ocupacion - media)) / NULLIF(COUNT(*) - 1, 0) AS var,
+               MIN(ocupacion) AS "min",
+               MAX(ocupacion) AS "max",
+               COUNT(*) AS "count"
+        FROM filas
+        GROUP BY dia_semana""", parametros)
+    tabla.index = pd.Index(np.asarray(DIAS_SEMANA)[tabla.pop("dia_semana").to_numpy(dtype=int)],
+                           name="dia_semana")
+    tabla["std"] = np.sqrt(tabla.pop("var").astype("float64"))
+    return tabla[ESTADISTICAS].reindex(DIAS_SEMANA).round(2)
+
+
+# ----------------------------------------------------------------------
+# Consultas ad hoc
+# ----------------------------------------------------------------------
+
+_INICIO_PERMITIDO = re.compile(r"\s*(select|with)\b", re.IGNORECASE)
+# Cadenas, identificadores entre comillas y comentarios: lo que hay dentro no
+# cuenta al buscar el inicio de la consulta ni otra sentencia
+_LITERALES = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*|/\*.*?\*/", re.DOTALL)
+
+
+def consulta_libre(base, sql, limite=LIMITE_FILAS, tiempo=TIEMPO_MAXIMO):
+    """Ejecuta una consulta del usuario con restricciones.
+
+    Solo se acepta una sentencia ``SELECT`` (o ``WITH … SELECT``) sobre una
+    conexión de solo lectura: en SQLite un autorizador rechaza todo lo que no
+    sea leer la tabla ``ocupacion``; en DuckDB no hay acceso a archivos
+    externos. Devuelve ``(tabla, truncada)``; lanza ``ValueError`` si la
+    consulta no se permite o falla y ``TimeoutError`` si rebasa ``tiempo``.
+    """
+    sql = sql.strip().rstrip(";").strip()
+    codigo = _LITERALES.sub(" ", sql).strip().rstrip(";")
+    if not _INICIO_PERMITIDO.match(codigo):
+        raise ValueError("Solo se permiten consultas SELECT (o WITH … SELECT)")
+    if ";" in codigo:
+        raise ValueError("Solo se permite una sentencia por consulta")
+
+    errores = (sqlite3.Error, _duckdb().Error) if base.motor == "duckdb" else sqlite3.Error
+    try:
+        tabla = base.consultar(sql, limite=limite + 1, tiempo=tiempo)
+    except errores as e:
+        raise ValueError(str(e)) from e
+    return tabla.head(limite), len(tabla) > limite
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consulta la historia de ocupación con SQL.")
+    parser.add_argument("consulta", help=f"sentencia SELECT sobre la tabla '{TABLA}'")
+    parser.add_argument("--datos", type=Path, default=DATA,
+                        help="CSV base de ocupación, o directorio / glob de CSV particionados")
+    parser.add_argument("--motor", choices=MOTORES, help="default: duckdb si está instalado")
+    parser.add_argument("--limite", type=int, default=LIMITE_FILAS,
+                        help=f"filas máximas (default: {LIMITE_FILAS:,})")
+    args = parser.parse_args(argv)
+
+    base = abrir_base(args.datos, motor=args.motor)
+    try:
+        tabla, truncada = consulta_libre(base, args.consulta, args.limite)
+    except (ValueError, TimeoutError) as e:
+        parser.exit(1, f"error: {e}\n")
+    print(tabla.to_string(index=False))
+    if truncada:
+        print(f"(se muestran las primeras {args.limite:,} filas)")
+
+
+if __name__ == "__main__":
+    main()